@@ -0,0 +1,218 @@
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')  # 基准测试不弹出图表窗口
+
+import matplotlib.pyplot as plt
+
+import instrumentation
+from instrumentation import stage
+from review import save_reviews_to_file
+from review_analysis import (FONT_PATH, init_jieba, clean_text, segment_text, extract_keywords, classify_feedback,
+                             load_reviews, visualize_reviews, generate_wordcloud)
+from synthetic import generate_processed_reviews
+
+HISTORY_FILE = 'benchmark_history.jsonl'
+DEFAULT_SCALES = (1000, 10000, 100000)
+# 每秒处理量低于上次结果的该比例时视为性能回退
+REGRESSION_THRESHOLD = 0.8
+
+
+def _run_stage(results, name, func, items, track_memory):
+    """
+    执行并记录一个阶段，出错时记录错误信息而不中断整个基准测试
+    """
+    if track_memory:
+        tracemalloc.start()
+    error = None
+    try:
+        with stage(name, items=items):
+            output = func()
+    except Exception as e:
+        output = None
+        error = f"{type(e).__name__}: {e}"
+    peak_memory = None
+    if track_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    stats = instrumentation.build_report()['stages'][name]
+    results[name] = {
+        'seconds': round(stats['wall_seconds'], 4),
+        'items_per_second': None if error else stats['items_per_second'],
+        'peak_memory_bytes': peak_memory,
+        'error': error
+    }
+    if error:
+        status = f"失败 ({error})"
+    elif stats['items_per_second']:
+        status = f"{stats['wall_seconds']:.2f}s, {stats['items_per_second']} 条/秒"
+    else:
+        status = f"{stats['wall_seconds']:.2f}s"
+    print(f"  {name}: {status}")
+    return output
+
+
+def benchmark_scale(count, track_memory=False):
+    """
+    在指定规模的模拟数据上测量各阶段性能
+    :param count: 评论数量
+    :param track_memory: 是否用 tracemalloc 统计各阶段的峰值内存（会拖慢执行速度）
+    :return: 阶段名 -> 结果
+    """
+    print(f"\n=== 规模 {count} ===")
+    instrumentation.reset_metrics()
+    results = {}
+    reviews = list(generate_processed_reviews(count))
+
+    cleaned = _run_stage(results, 'clean_text', lambda: [clean_text(r['content']) for r in reviews], count, track_memory)
+    # 词典加载只发生一次，单独统计，避免计入分词吞吐
+    _run_stage(results, 'jieba_init', init_jieba, None, False)
+    _run_stage(results, 'segment_text', lambda: [segment_text(text) for text in cleaned], count, track_memory)
+    _run_stage(results, 'extract_keywords', lambda: [extract_keywords(text) for text in cleaned], count, track_memory)
+    _run_stage(results, 'classify_feedback', lambda: [classify_feedback(r) for r in reviews], count, track_memory)
+
+    # 文件读写和图表在临时目录中进行，字体路径需要在切换目录前转换为绝对路径
+    font_path = os.path.abspath(FONT_PATH)
+    work_dir = tempfile.mkdtemp(prefix='utopia_bench_')
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        _run_stage(results, 'save_reviews_to_file',
+                   lambda: save_reviews_to_file(reviews, 'resident_evil_requiem_reviews.json'), count, track_memory)
+        table = _run_stage(results, 'load_reviews', load_reviews, count, track_memory)
+        if table is not None:
+            _run_stage(results, 'visualize_reviews', lambda: visualize_reviews(table), count, track_memory)
+            _run_stage(results, 'generate_wordcloud', lambda: generate_wordcloud(table, font_path), count,
+                       track_memory)
+    finally:
+        plt.close('all')
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    # 每个规模在单独的子进程中运行（见 run_benchmarks），峰值内存只反映本规模
+    results['peak_rss_bytes'] = instrumentation.peak_rss_bytes()
+    return results
+
+
+def _benchmark_in_subprocess(count, track_memory):
+    """
+    在新的 Python 进程中运行一个规模的基准测试
+    ru_maxrss 在进程内只增不减，同一进程中依次运行多个规模时后面规模的峰值内存没有意义
+    """
+    fd, output = tempfile.mkstemp(prefix='utopia_bench_', suffix='.json')
+    os.close(fd)
+    try:
+        command = [sys.executable, os.path.abspath(__file__), '--single', str(count), output]
+        if track_memory:
+            command.append('--memory')
+        subprocess.run(command, check=True)
+        with open(output, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(output)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def load_history(filename=HISTORY_FILE):
+    """
+    加载历史基准测试结果
+    :param filename: 历史文件名（每行一次运行）
+    :return: 运行结果列表
+    """
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def find_regressions(current, history, threshold=REGRESSION_THRESHOLD):
+    """
+    与每个规模、每个阶段最近一次的历史结果比较每秒处理量
+    只与同样开启或关闭内存统计的运行比较，tracemalloc 会明显拖慢执行速度
+    :param current: 本次运行结果
+    :param history: 历史运行结果
+    :param threshold: 低于历史结果该比例时视为回退
+    :return: 回退列表
+    """
+    regressions = []
+    for scale, stages in current['scales'].items():
+        for name, result in stages.items():
+            if not isinstance(result, dict) or not result.get('items_per_second'):
+                continue
+            for previous in reversed(history):
+                if previous.get('track_memory') != current.get('track_memory'):
+                    continue
+                baseline = previous['scales'].get(scale, {}).get(name)
+                if isinstance(baseline, dict) and baseline.get('items_per_second'):
+                    ratio = result['items_per_second'] / baseline['items_per_second']
+                    if ratio < threshold:
+                        regressions.append({
+                            'scale': scale, 'stage': name, 'ratio': round(ratio, 3),
+                            'baseline_commit': previous.get('commit'), 'baseline': baseline['items_per_second'],
+                            'current': result['items_per_second']
+                        })
+                    break
+    return regressions
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, track_memory=False, history_file=HISTORY_FILE):
+    """
+    运行全部规模的基准测试，结果追加到历史文件并检查性能回退
+    :param scales: 评论数量列表
+    :param track_memory: 是否统计各阶段的峰值内存
+    :param history_file: 历史文件名
+    :return: 回退列表
+    """
+    history = load_history(history_file)
+    current = {
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'track_memory': track_memory,
+        'scales': {str(count): _benchmark_in_subprocess(count, track_memory) for count in scales}
+    }
+    with open(history_file, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(current, ensure_ascii=False) + '\n')
+    print(f"\n基准测试结果已追加到 {history_file}")
+
+    regressions = find_regressions(current, history)
+    for item in regressions:
+        print(f"性能回退: 规模 {item['scale']} 的 {item['stage']} 每秒处理量 "
+              f"{item['baseline']} -> {item['current']}（{item['ratio'] * 100:.0f}%，对比 {item['baseline_commit']}）")
+    if not regressions:
+        print("未发现性能回退")
+    return regressions
+
+
+if __name__ == "__main__":
+    # 用法: python benchmark.py [1000,10000,100000,1000000] [--memory]
+    if '--single' in sys.argv:
+        # 由 _benchmark_in_subprocess 调用: --single 规模 结果文件
+        position = sys.argv.index('--single')
+        single_results = benchmark_scale(int(sys.argv[position + 1]), track_memory='--memory' in sys.argv)
+        with open(sys.argv[position + 2], 'w', encoding='utf-8') as f:
+            json.dump(single_results, f)
+        sys.exit(0)
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    scales = [int(size) for size in args[0].split(',')] if args else DEFAULT_SCALES
+    found = run_benchmarks(scales, track_memory='--memory' in sys.argv)
+    sys.exit(1 if found else 0)
@@ -0,0 +1,162 @@
+import argparse
+import json
+import os
+import sys
+
+# 本文件只在顶部导入标准库中的轻量模块，各子命令用到的依赖在命令内部导入，
+# stats 等只读命令不会加载 jieba、pandas、matplotlib、requests 等
+
+APPID = 3764200
+RAW_REVIEWS_FILE = 'raw_reviews.json'
+REVIEWS_FILE = 'resident_evil_requiem_reviews.json'
+PROCESSED_FILE = 'processed_reviews.json'
+
+
+def _load_json(filename):
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def cmd_crawl(args):
+    """
+    从 Steam 获取原始评论并保存为 JSON
+    """
+    from instrumentation import stage, add_items, write_report, print_report
+    from review import get_steam_reviews
+
+    with stage('crawl'):
+        reviews = get_steam_reviews(args.appid, max_reviews=args.max_reviews)
+    add_items('crawl', len(reviews))
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(reviews, f, ensure_ascii=False)
+    print(f"原始评论已保存到 {args.output}")
+    print_report(write_report())
+    return 0 if reviews else 1
+
+
+def cmd_enrich(args):
+    """
+    读取原始评论，获取玩家信息后保存为 JSON 和 Excel
+    """
+    from instrumentation import stage, write_report, print_report
+    from review import ENRICH_WORKERS, process_reviews, save_reviews_to_file
+    from rollup import ingest_reviews
+
+    reviews = _load_json(args.input)
+    with stage('enrich', items=len(reviews)):
+        processed_reviews = process_reviews(reviews, max_workers=args.workers or ENRICH_WORKERS,
+                                            enrich=not args.no_players)
+    with stage('save', items=len(processed_reviews)):
+        save_reviews_to_file(processed_reviews, args.output)
+    with stage('rollup', items=len(processed_reviews)):
+        ingest_reviews(processed_reviews)
+    print_report(write_report())
+    return 0
+
+
+def cmd_analyze(args):
+    """
+    清洗、分词、分类和可视化（review_analysis.py 的完整流程）
+    """
+    if args.no_show:
+        import matplotlib
+        matplotlib.use('Agg')
+    from review_analysis import main
+
+    main()
+    return 0
+
+
+def cmd_report(args):
+    """
+    将处理后的评论增量计入按天汇总（--rebuild 时重新构建），打印时间窗口统计，可选导出带汇总表的 Excel
+    """
+    from rollup import ingest_reviews, rolling_windows, compare_periods, print_window
+
+    reviews = _load_json(args.input)
+    rollups = ingest_reviews(reviews, rebuild=args.rebuild)
+
+    windows = [int(days) for days in args.windows.split(',')]
+    for days, window in rolling_windows(rollups, windows=windows).items():
+        print_window(f"近 {days} 天", window)
+    if args.compare:
+        comparison = compare_periods(rollups, args.compare, days=args.compare_days)
+        print_window(f"{args.compare} 之前", comparison['before'])
+        print_window(f"{args.compare} 之后", comparison['after'])
+        delta = comparison['delta']
+        print(f"\n变化: 评论数 {delta['count']:+d}，推荐率 {delta['recommendation_rate'] * 100:+.1f}%，"
+              f"游戏时长中位数 {delta['median_hours']:+} 小时")
+
+    if args.excel:
+        from excel_export import write_reviews_excel, rollup_summary_rows, category_summary_rows
+
+        summaries = {'按天汇总': rollup_summary_rows(rollups), '分类统计': category_summary_rows(rollups)}
+        write_reviews_excel(reviews, args.excel, summaries=summaries)
+        print(f"报告已保存到 {args.excel}")
+    return 0
+
+
+def cmd_stats(args):
+    """
+    读取已有的按天汇总和上次运行报告，快速打印统计（不加载任何重依赖）
+    """
+    from rollup import ROLLUP_FILE, load_rollups, rolling_windows, print_window
+
+    if not os.path.exists(ROLLUP_FILE):
+        print(f"未找到 {ROLLUP_FILE}，请先运行: python cli.py report")
+        return 1
+    rollups = load_rollups()
+    windows = [int(days) for days in args.windows.split(',')]
+    for days, window in rolling_windows(rollups, windows=windows).items():
+        print_window(f"近 {days} 天", window)
+
+    from instrumentation import REPORT_FILE
+    if os.path.exists(REPORT_FILE):
+        report = _load_json(REPORT_FILE)
+        print(f"\n上次运行: {report['started_at']}，耗时 {report['total_seconds']:.1f}s")
+        for name, s in report['stages'].items():
+            speed = f"，{s['items_per_second']} 条/秒" if s['items_per_second'] else ''
+            print(f"  {name}: {s['wall_seconds']:.2f}s{speed}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Steam 评论采集与分析')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    crawl = subparsers.add_parser('crawl', help='从 Steam 获取原始评论')
+    crawl.add_argument('--appid', type=int, default=APPID)
+    crawl.add_argument('--max-reviews', type=int, default=10000)
+    crawl.add_argument('--output', default=RAW_REVIEWS_FILE)
+    crawl.set_defaults(func=cmd_crawl)
+
+    enrich = subparsers.add_parser('enrich', help='获取玩家信息并保存评论')
+    enrich.add_argument('--input', default=RAW_REVIEWS_FILE)
+    enrich.add_argument('--output', default=REVIEWS_FILE)
+    enrich.add_argument('--workers', type=int, default=None,
+                        help='同时请求玩家信息的线程数，默认为 STEAM_ENRICH_WORKERS 环境变量或 4')
+    enrich.add_argument('--no-players', action='store_true', help='不请求玩家信息')
+    enrich.set_defaults(func=cmd_enrich)
+
+    analyze = subparsers.add_parser('analyze', help='清洗、分词、分类和可视化')
+    analyze.add_argument('--no-show', action='store_true', help='只保存图表，不弹出窗口')
+    analyze.set_defaults(func=cmd_analyze)
+
+    report = subparsers.add_parser('report', help='更新按天汇总并打印时间窗口统计')
+    report.add_argument('--input', default=PROCESSED_FILE)
+    report.add_argument('--rebuild', action='store_true', help='丢弃已有汇总，从输入文件重新构建')
+    report.add_argument('--windows', default='7,30', help='逗号分隔的窗口天数')
+    report.add_argument('--compare', metavar='YYYY-MM-DD', help='对比该日期前后的数据（如DLC上线日）')
+    report.add_argument('--compare-days', type=int, default=14)
+    report.add_argument('--excel', metavar='FILE', help='导出带汇总表的 Excel 报告')
+    report.set_defaults(func=cmd_report)
+
+    stats = subparsers.add_parser('stats', help='快速查看已有的汇总统计')
+    stats.add_argument('--windows', default='7,30', help='逗号分隔的窗口天数')
+    stats.set_defaults(func=cmd_stats)
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    sys.exit(args.func(args))
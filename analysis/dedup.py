@@ -0,0 +1,198 @@
+import hashlib
+import json
+import re
+import zlib
+
+import numpy as np
+
+# MinHash 使用的素数，保证 a * x + b 在 uint64 范围内不溢出
+HASH_PRIME = (1 << 31) - 1
+
+
+def normalize_text(text):
+    """
+    规范化文本，用于精确去重
+    :param text: 清洗后的文本
+    :return: 去除空白并转为小写的文本
+    """
+    return re.sub(r'\s+', '', text).lower()
+
+
+def get_shingles(words, text, shingle_size=2):
+    """
+    生成评论的词组片段（shingle）
+    :param words: 分词结果
+    :param text: 规范化后的文本，分词为空时按字切分
+    :param shingle_size: 每个片段包含的词数
+    :return: 片段集合
+    """
+    tokens = list(words) if words else list(text)
+    if len(tokens) < shingle_size:
+        return set(tokens)
+    return {' '.join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+
+
+def choose_bands(threshold, num_perm):
+    """
+    根据相似度阈值选择 LSH 的分段数和每段行数
+    :param threshold: 相似度阈值
+    :param num_perm: 哈希函数数量
+    :return: (分段数, 每段行数)
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        # (1/b)^(1/r) 近似为候选概率曲线的拐点
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+def minhash_signature(shingles, a, b):
+    """
+    计算 MinHash 签名
+    :param shingles: 片段集合
+    :param a: 哈希函数系数
+    :param b: 哈希函数偏移
+    :return: 签名数组
+    """
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode('utf-8')) & HASH_PRIME for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+    return ((np.outer(hashes, a) + b) % HASH_PRIME).min(axis=0)
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _union(parent, i, j):
+    root_i, root_j = _find(parent, i), _find(parent, j)
+    if root_i != root_j:
+        # 以较早出现的评论作为代表
+        parent[max(root_i, root_j)] = min(root_i, root_j)
+
+
+def find_duplicates(reviews, threshold=0.8, num_perm=128, shingle_size=2, min_length=5,
+                    min_shingles=3, max_candidates=5, seed=42):
+    """
+    查找完全重复和近似重复（复制粘贴/玩梗）的评论
+    先对规范化文本做精确哈希，再用 MinHash + LSH 分桶查找近似重复，
+    每条评论只与所在桶中的少量代表比较，整体接近线性时间
+    :param reviews: 评论的可迭代对象，需要 cleaned_content 字段，可选 words 字段
+    :param threshold: 近似重复的相似度阈值（Jaccard）
+    :param num_perm: MinHash 哈希函数数量
+    :param shingle_size: 每个片段包含的词数
+    :param min_length: 规范化后短于该长度的评论不参与去重（如“好玩”）
+    :param min_shingles: 片段数少于该值的评论只做精确去重，避免短评被误判为近似重复
+    :param max_candidates: 每个桶保留用于比较的代表数量
+    :param seed: 随机种子
+    :return: 重复簇列表
+    """
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, HASH_PRIME, size=num_perm).astype(np.uint64)
+    b = rng.randint(0, HASH_PRIME, size=num_perm).astype(np.uint64)
+    bands, rows = choose_bands(threshold, num_perm)
+
+    parent = []
+    digests = []
+    exact_heads = {}
+    buckets = {}
+    signatures = {}
+
+    for i, review in enumerate(reviews):
+        parent.append(i)
+        digests.append(None)
+        text = normalize_text(review.get('cleaned_content', ''))
+        if len(text) < min_length:
+            continue
+
+        # 精确去重
+        digest = hashlib.md5(text.encode('utf-8')).hexdigest()
+        digests[i] = digest
+        if digest in exact_heads:
+            _union(parent, exact_heads[digest], i)
+            continue
+        exact_heads[digest] = i
+
+        # 近似去重
+        shingles = get_shingles(review.get('words'), text, shingle_size)
+        if len(shingles) < min_shingles:
+            continue
+        signature = minhash_signature(shingles, a, b)
+        signatures[i] = signature
+        for band in range(bands):
+            key = (band, signature[band * rows:(band + 1) * rows].tobytes())
+            candidates = buckets.setdefault(key, [])
+            for j in candidates:
+                if np.mean(signatures[j] == signature) >= threshold:
+                    _union(parent, j, i)
+            if len(candidates) < max_candidates:
+                candidates.append(i)
+
+    groups = {}
+    for i in range(len(parent)):
+        groups.setdefault(_find(parent, i), []).append(i)
+
+    clusters = []
+    for representative, members in groups.items():
+        if len(members) < 2:
+            continue
+        exact = len({digests[m] for m in members}) == 1
+        clusters.append({
+            'representative': representative,
+            'members': members,
+            'size': len(members),
+            'type': 'exact' if exact else 'near'
+        })
+    clusters.sort(key=lambda cluster: cluster['size'], reverse=True)
+    return clusters
+
+
+def duplicate_indices(clusters):
+    """
+    获取需要去除的重复评论行号（每个簇保留代表评论）
+    :param clusters: 重复簇列表
+    :return: 行号集合
+    """
+    removed = set()
+    for cluster in clusters:
+        removed.update(m for m in cluster['members'] if m != cluster['representative'])
+    return removed
+
+
+def deduplicate_reviews(reviews, **kwargs):
+    """
+    去除重复评论，每个重复簇只保留最早出现的一条
+    :param reviews: 评论列表
+    :param kwargs: 传给 find_duplicates 的参数
+    :return: (去重后的评论列表, 重复簇列表)
+    """
+    clusters = find_duplicates(reviews, **kwargs)
+    removed = duplicate_indices(clusters)
+    kept = [review for i, review in enumerate(reviews) if i not in removed]
+    return kept, clusters
+
+
+def save_clusters(clusters, reviews, filename='duplicate_clusters.json'):
+    """
+    保存重复簇，附带代表评论内容便于人工检查
+    :param clusters: 重复簇列表
+    :param reviews: 原始评论列表
+    :param filename: 文件名
+    """
+    output = [
+        dict(cluster, content=reviews[cluster['representative']].get('content', ''))
+        for cluster in clusters
+    ]
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+    print(f"重复簇已保存到 {filename}")
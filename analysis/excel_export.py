@@ -0,0 +1,108 @@
+from itertools import islice
+
+# Excel 单个工作表的行数上限（含表头）
+EXCEL_MAX_ROWS = 1048576
+# Excel 单元格的字符数上限
+EXCEL_MAX_CELL_LENGTH = 32767
+
+
+def _cell_value(value):
+    """
+    转换为 Excel 单元格可写入的值
+    """
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        value = ' '.join(str(item) for item in value)
+    if isinstance(value, str) and len(value) > EXCEL_MAX_CELL_LENGTH:
+        value = value[:EXCEL_MAX_CELL_LENGTH]
+    return value
+
+
+def write_reviews_excel(reviews, filename, columns=None, chunk_size=10000, summaries=None,
+                        max_rows=EXCEL_MAX_ROWS, sheet_title='评论'):
+    """
+    以只写（流式）模式导出评论到Excel，内存占用与评论数量无关
+    超过单个工作表的行数上限时自动新建工作表
+    :param reviews: 评论的可迭代对象（列表、生成器或评论表）
+    :param filename: Excel 文件名
+    :param columns: 导出的字段，默认为第一条评论的全部字段
+    :param chunk_size: 每批写入的评论数量
+    :param summaries: 可选的汇总表，工作表名 -> 行列表（第一行为表头）
+    :param max_rows: 每个工作表的行数上限（含表头）
+    :param sheet_title: 评论工作表名称
+    :return: 写入的评论数量
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    iterator = iter(reviews)
+    sheet = None
+    sheet_count = 0
+    sheet_rows = 0
+    total = 0
+
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            break
+        if columns is None:
+            columns = list(chunk[0].keys())
+
+        for review in chunk:
+            # 当前工作表写满时新建工作表
+            if sheet is None or sheet_rows >= max_rows:
+                sheet_count += 1
+                sheet = workbook.create_sheet(sheet_title if sheet_count == 1 else f'{sheet_title}_{sheet_count}')
+                sheet.append(columns)
+                sheet_rows = 1
+            sheet.append([_cell_value(review.get(column)) for column in columns])
+            sheet_rows += 1
+        total += len(chunk)
+        print(f"已写入 {total} 条评论")
+
+    if sheet is None:
+        sheet = workbook.create_sheet(sheet_title)
+        if columns:
+            sheet.append(columns)
+
+    for title, rows in (summaries or {}).items():
+        summary_sheet = workbook.create_sheet(title)
+        for row in rows:
+            summary_sheet.append([_cell_value(value) for value in row])
+
+    workbook.save(filename)
+    return total
+
+
+def rollup_summary_rows(rollups):
+    """
+    将按天汇总的数据转换为汇总表的行
+    :param rollups: rollup.py 生成的按天汇总数据
+    :return: 行列表（第一行为表头）
+    """
+    rows = [['日期', '评论数', '推荐数', '推荐率', '游戏时长中位数']]
+    for publish_date, day in sorted(rollups.get('days', {}).items()):
+        rate = round(day['recommended'] / day['count'], 4) if day['count'] else 0.0
+        rows.append([publish_date, day['count'], day['recommended'], rate, day['median_hours']])
+    return rows
+
+
+def category_summary_rows(rollups):
+    """
+    将按天汇总的数据转换为分类正负面统计表的行
+    :param rollups: rollup.py 生成的按天汇总数据
+    :return: 行列表（第一行为表头）
+    """
+    totals = {}
+    for day in rollups.get('days', {}).values():
+        for category, (positive, negative) in day['categories'].items():
+            counts = totals.setdefault(category, [0, 0])
+            counts[0] += positive
+            counts[1] += negative
+
+    rows = [['分类', '正面', '负面', '负面占比']]
+    for category, (positive, negative) in sorted(totals.items(), key=lambda item: -sum(item[1])):
+        total = positive + negative
+        rows.append([category, positive, negative, round(negative / total, 4) if total else 0.0])
+    return rows
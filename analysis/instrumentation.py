@@ -0,0 +1,271 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块
+    resource = None
+
+# 设置该环境变量为目录名时，每个阶段的 cProfile 结果保存到该目录（可用 snakeviz 等工具查看）
+PROFILE_ENV = 'UTOPIA_PROFILE'
+REPORT_FILE = 'run_report.json'
+PROMETHEUS_FILE = 'run_metrics.prom'
+METRIC_PREFIX = 'utopia'
+# 等待时间的缩放比例，对本地模拟服务器压测时可设为 0.01 等较小的值
+SLEEP_SCALE = float(os.environ.get('UTOPIA_SLEEP_SCALE', '1'))
+
+_run = {}
+# 并发请求玩家信息时多个线程会同时更新统计数据
+_lock = threading.Lock()
+
+
+def reset_metrics():
+    """
+    清空本次运行的统计数据
+    """
+    _run.clear()
+    _run.update({
+        'started_at': time.time(),
+        'stages': {},
+        'timeline': [],
+        'http': {},
+        'sleep_seconds': 0.0,
+        'counters': {}
+    })
+
+
+reset_metrics()
+
+
+def _new_stage(name):
+    return _run['stages'].setdefault(name, {'calls': 0, 'errors': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                                            'items': 0})
+
+
+@contextmanager
+def stage(name, items=None):
+    """
+    统计一个流水线阶段的墙钟时间和CPU时间
+    用法: with stage('segment', items=len(reviews)): ...
+    阶段抛出异常时记为失败，不计入处理数量，异常继续向外抛出
+    :param name: 阶段名称（英文，用作 Prometheus 标签）
+    :param items: 本阶段处理的评论数量，用于计算每秒处理量
+    """
+    profiler = None
+    profile_dir = os.environ.get(PROFILE_ENV)
+    if profile_dir:
+        import cProfile
+        profiler = cProfile.Profile()
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    failed = False
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+
+        stats = _new_stage(name)
+        stats['calls'] += 1
+        stats['wall_seconds'] += wall
+        stats['cpu_seconds'] += cpu
+        if failed:
+            stats['errors'] += 1
+        elif items is not None:
+            stats['items'] += items
+        # 记录各阶段的起止时间，便于与 py-spy 等采样工具的火焰图对齐
+        end = time.time() - _run['started_at']
+        _run['timeline'].append({'stage': name, 'start': round(end - wall, 4), 'end': round(end, 4), 'failed': failed})
+
+        if profiler:
+            os.makedirs(profile_dir, exist_ok=True)
+            profiler.dump_stats(os.path.join(profile_dir, f'{name}.prof'))
+
+
+def add_items(name, items):
+    """
+    为阶段追加处理数量（阶段开始时数量未知的情况）
+    :param name: 阶段名称
+    :param items: 处理数量
+    """
+    stats = _new_stage(name)
+    stats['items'] += items
+
+
+def record_http(endpoint, status, latency, retry=False):
+    """
+    记录一次HTTP请求
+    :param endpoint: 接口名称，如 appreviews、profile、games
+    :param status: 状态码，请求异常时为异常类型名
+    :param latency: 耗时（秒）
+    :param retry: 是否为重试请求
+    """
+    with _lock:
+        stats = _run['http'].setdefault(endpoint, {
+            'requests': 0, 'latency_seconds': 0.0, 'max_latency_seconds': 0.0, 'retries': 0, 'status': {}
+        })
+        stats['requests'] += 1
+        stats['latency_seconds'] += latency
+        stats['max_latency_seconds'] = max(stats['max_latency_seconds'], latency)
+        if retry:
+            stats['retries'] += 1
+        stats['status'][str(status)] = stats['status'].get(str(status), 0) + 1
+
+
+def timed_sleep(seconds):
+    """
+    等待并累计等待时间，替代 time.sleep
+    多个线程同时等待时累计的是各线程等待时间之和
+    :param seconds: 秒数（实际等待时间还要乘以 SLEEP_SCALE）
+    """
+    seconds *= SLEEP_SCALE
+    with _lock:
+        _run['sleep_seconds'] += seconds
+    time.sleep(seconds)
+
+
+def increment(name, value=1):
+    """
+    累加自定义计数器
+    :param name: 计数器名称
+    :param value: 增量
+    """
+    with _lock:
+        _run['counters'][name] = _run['counters'].get(name, 0) + value
+
+
+def peak_rss_bytes():
+    """
+    获取进程的峰值常驻内存
+    :return: 字节数，无法获取时返回 None
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return peak if sys.platform == 'darwin' else peak * 1024
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+    except (ImportError, AttributeError):
+        return None
+
+
+def build_report():
+    """
+    生成本次运行的统计报告
+    :return: 报告字典
+    """
+    stages = {}
+    for name, stats in _run['stages'].items():
+        stages[name] = dict(stats)
+        stages[name]['items_per_second'] = (
+            round(stats['items'] / stats['wall_seconds'], 2) if stats['items'] and stats['wall_seconds'] else None
+        )
+
+    return {
+        'started_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(_run['started_at'])),
+        'total_seconds': round(time.time() - _run['started_at'], 4),
+        'peak_rss_bytes': peak_rss_bytes(),
+        'stages': stages,
+        'timeline': list(_run['timeline']),
+        'http': {endpoint: dict(stats, status=dict(stats['status'])) for endpoint, stats in _run['http'].items()},
+        'sleep_seconds': round(_run['sleep_seconds'], 4),
+        'counters': dict(_run['counters'])
+    }
+
+
+def _prometheus_lines(report):
+    lines = []
+
+    def metric(name, help_text, samples, metric_type='gauge'):
+        full_name = f'{METRIC_PREFIX}_{name}'
+        lines.append(f'# HELP {full_name} {help_text}')
+        lines.append(f'# TYPE {full_name} {metric_type}')
+        for labels, value in samples:
+            label_text = ','.join(f'{key}="{val}"' for key, val in labels.items())
+            lines.append(f'{full_name}{{{label_text}}} {value}' if label_text else f'{full_name} {value}')
+
+    stages = report['stages']
+    metric('stage_wall_seconds', 'Wall-clock seconds spent in each pipeline stage',
+           [({'stage': name}, round(s['wall_seconds'], 6)) for name, s in stages.items()])
+    metric('stage_cpu_seconds', 'CPU seconds spent in each pipeline stage',
+           [({'stage': name}, round(s['cpu_seconds'], 6)) for name, s in stages.items()])
+    metric('stage_items_total', 'Reviews processed by each pipeline stage',
+           [({'stage': name}, s['items']) for name, s in stages.items()], 'counter')
+    metric('stage_errors_total', 'Failed runs of each pipeline stage',
+           [({'stage': name}, s['errors']) for name, s in stages.items()], 'counter')
+    metric('stage_items_per_second', 'Reviews processed per second by each pipeline stage',
+           [({'stage': name}, s['items_per_second']) for name, s in stages.items() if s['items_per_second']])
+
+    http = report['http']
+    metric('http_requests_total', 'HTTP requests by endpoint and status',
+           [({'endpoint': endpoint, 'status': status}, count)
+            for endpoint, s in http.items() for status, count in s['status'].items()], 'counter')
+    metric('http_latency_seconds_sum', 'Total HTTP latency by endpoint',
+           [({'endpoint': endpoint}, round(s['latency_seconds'], 6)) for endpoint, s in http.items()])
+    metric('http_latency_seconds_max', 'Maximum HTTP latency by endpoint',
+           [({'endpoint': endpoint}, round(s['max_latency_seconds'], 6)) for endpoint, s in http.items()])
+    metric('http_retries_total', 'HTTP retries by endpoint',
+           [({'endpoint': endpoint}, s['retries']) for endpoint, s in http.items()], 'counter')
+
+    metric('sleep_seconds', 'Seconds spent sleeping between requests', [({}, report['sleep_seconds'])])
+    metric('run_seconds', 'Total run time in seconds', [({}, report['total_seconds'])])
+    if report['peak_rss_bytes'] is not None:
+        metric('peak_rss_bytes', 'Peak resident set size of the process', [({}, report['peak_rss_bytes'])])
+    if report['counters']:
+        metric('counter', 'Custom pipeline counters',
+               [({'name': name}, value) for name, value in report['counters'].items()])
+    return lines
+
+
+def write_report(json_filename=REPORT_FILE, prometheus_filename=PROMETHEUS_FILE):
+    """
+    输出 JSON 运行报告和 Prometheus textfile（供 node_exporter 采集）
+    :param json_filename: JSON 报告文件名
+    :param prometheus_filename: Prometheus textfile 文件名
+    :return: 报告字典
+    """
+    report = build_report()
+    with open(json_filename, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    # 先写临时文件再替换，避免采集到写了一半的文件
+    temp_filename = prometheus_filename + '.tmp'
+    with open(temp_filename, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(_prometheus_lines(report)) + '\n')
+    os.replace(temp_filename, prometheus_filename)
+
+    print(f"运行报告已保存到 {json_filename} 和 {prometheus_filename}")
+    return report
+
+
+def print_report(report=None):
+    """
+    打印各阶段耗时
+    :param report: 报告字典，默认为当前统计
+    """
+    report = report or build_report()
+    print("\n=== 运行统计 ===")
+    for name, s in report['stages'].items():
+        speed = f"，{s['items_per_second']} 条/秒" if s['items_per_second'] else ''
+        errors = f"，失败 {s['errors']} 次" if s['errors'] else ''
+        print(f"{name}: 耗时 {s['wall_seconds']:.2f}s（CPU {s['cpu_seconds']:.2f}s）{speed}{errors}")
+    for endpoint, s in report['http'].items():
+        average = s['latency_seconds'] / s['requests'] if s['requests'] else 0
+        print(f"HTTP {endpoint}: {s['requests']} 次请求，平均耗时 {average:.2f}s，重试 {s['retries']} 次")
+    print(f"等待时间: {report['sleep_seconds']:.2f}s")
+    if report['peak_rss_bytes'] is not None:
+        print(f"峰值内存: {report['peak_rss_bytes'] / 1024 / 1024:.1f} MB")
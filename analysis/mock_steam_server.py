@@ -0,0 +1,413 @@
+import argparse
+import base64
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+import instrumentation
+from instrumentation import stage, add_items, build_report
+from synthetic import generate_raw_reviews
+
+FIXTURES_FILE = 'steam_fixtures.json'
+LOAD_TEST_REPORT_FILE = 'load_test_report.json'
+# 单页评论数量上限，与 Steam 接口一致
+MAX_PAGE_SIZE = 100
+# 注入 5xx 错误时随机使用的状态码
+SERVER_ERRORS = (500, 502, 503)
+
+
+def synthetic_fixtures(count=1000, seed=42, **kwargs):
+    """
+    用模拟评论生成回放数据，每个评论作者对应一个玩家资料
+    :param count: 评论数量
+    :param seed: 随机种子
+    :param kwargs: 传给 generate_raw_reviews 的参数
+    :return: 回放数据 {'reviews': [...], 'profiles': {steamid: {'level', 'owned_games'}}}
+    """
+    reviews = list(generate_raw_reviews(count, seed=seed, **kwargs))
+    rng = np.random.RandomState(seed + 2)
+    profiles = {}
+    for review in reviews:
+        steamid = review['author']['steamid']
+        if steamid not in profiles:
+            profiles[steamid] = {
+                'level': int(rng.randint(1, 51)),
+                'owned_games': int(rng.lognormal(np.log(80), 0.8)) + 1
+            }
+    return {'reviews': reviews, 'profiles': profiles}
+
+
+def record_fixtures(appid, max_reviews=1000, max_profiles=200, filename=FIXTURES_FILE):
+    """
+    从 Steam 录制回放数据（需要能访问 Steam）
+    :param appid: 游戏的AppID
+    :param max_reviews: 录制的评论数量
+    :param max_profiles: 录制的玩家资料数量，其余玩家在回放时视为不存在
+    :param filename: 回放数据文件名
+    :return: 回放数据
+    """
+    from review import get_steam_reviews, get_player_info
+
+    reviews = get_steam_reviews(appid, max_reviews=max_reviews)
+    profiles = {}
+    for review in reviews:
+        steamid = review.get('author', {}).get('steamid')
+        if steamid and steamid not in profiles and len(profiles) < max_profiles:
+            profiles[steamid] = get_player_info(steamid)
+
+    fixtures = {'reviews': reviews, 'profiles': profiles}
+    save_fixtures(fixtures, filename)
+    return fixtures
+
+
+def load_fixtures(filename=FIXTURES_FILE):
+    """
+    加载回放数据
+    :param filename: 回放数据文件名
+    :return: 回放数据，文件不存在时返回 None
+    """
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_fixtures(fixtures, filename=FIXTURES_FILE):
+    """
+    保存回放数据
+    :param fixtures: 回放数据
+    :param filename: 回放数据文件名
+    """
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(fixtures, f, ensure_ascii=False)
+    print(f"回放数据已保存到 {filename}（{len(fixtures['reviews'])} 条评论，{len(fixtures['profiles'])} 个玩家）")
+
+
+def encode_cursor(offset):
+    """
+    将偏移量编码为不透明的光标（Steam 的光标同样是 base64 字符串）
+    """
+    return base64.b64encode(f'offset:{offset}'.encode('ascii')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    解析光标，'*' 表示第一页，无法解析时返回 None
+    """
+    if not cursor or cursor == '*':
+        return 0
+    try:
+        return int(base64.b64decode(cursor).decode('ascii').split(':', 1)[1])
+    except (ValueError, IndexError, UnicodeDecodeError):
+        return None
+
+
+class MockSteamServer(ThreadingHTTPServer):
+    """
+    本地 Steam 模拟服务器，回放评论接口和玩家资料页面
+    故障注入由请求路径和该路径的请求次数决定，与线程调度无关，相同参数多次运行结果一致
+    """
+    daemon_threads = True
+
+    def __init__(self, address, fixtures, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 max_requests_per_second=None, retry_after=1, seed=42):
+        """
+        :param address: (主机, 端口)，端口为 0 时自动选择
+        :param fixtures: 回放数据
+        :param latency: 每个请求的基础延迟（秒）
+        :param jitter: 在基础延迟上随机增加的最大延迟（秒）
+        :param error_rate: 返回 5xx 错误的概率
+        :param rate_limit_rate: 随机返回 429 的概率
+        :param max_requests_per_second: 每秒请求数上限，超过时返回 429
+        :param retry_after: 429 和 503 响应的 Retry-After 秒数
+        :param seed: 随机种子
+        """
+        super().__init__(address, MockSteamHandler)
+        # 按时间从新到旧排序，与 filter=recent 一致
+        self.reviews = sorted(fixtures['reviews'], key=lambda review: -review.get('timestamp_created', 0))
+        self.profiles = fixtures['profiles']
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.max_requests_per_second = max_requests_per_second
+        self.retry_after = retry_after
+        self.seed = seed
+
+        self.lock = threading.Lock()
+        self.request_counts = {}
+        self.recent_requests = deque()
+        self.stats = {}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def next_random(self, path):
+        """
+        返回该路径本次请求的随机数生成器，同一路径第 N 次请求的结果固定
+        """
+        with self.lock:
+            count = self.request_counts.get(path, 0)
+            self.request_counts[path] = count + 1
+        return random.Random(f'{self.seed}:{path}:{count}')
+
+    def over_rate_limit(self):
+        """
+        检查最近一秒的请求数是否超过上限
+        """
+        if not self.max_requests_per_second:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            while self.recent_requests and now - self.recent_requests[0] >= 1:
+                self.recent_requests.popleft()
+            if len(self.recent_requests) >= self.max_requests_per_second:
+                return True
+            self.recent_requests.append(now)
+            return False
+
+    def record(self, endpoint, status):
+        with self.lock:
+            counts = self.stats.setdefault(endpoint, {})
+            counts[str(status)] = counts.get(str(status), 0) + 1
+
+    def review_page(self, query):
+        """
+        生成评论接口的一页响应
+        """
+        offset = decode_cursor(query.get('cursor', ['*'])[0])
+        if offset is None:
+            return {'success': 2}
+        try:
+            page_size = min(int(query.get('num_per_page', ['20'])[0]), MAX_PAGE_SIZE)
+        except ValueError:
+            page_size = 20
+        page = self.reviews[offset:offset + page_size]
+
+        summary = {'num_reviews': len(page)}
+        if offset == 0:
+            positive = sum(1 for review in self.reviews if review.get('voted_up'))
+            summary.update({
+                'review_score': 0,
+                'total_positive': positive,
+                'total_negative': len(self.reviews) - positive,
+                'total_reviews': len(self.reviews)
+            })
+        # 最后一页之后返回空列表和相同的光标
+        return {
+            'success': 1,
+            'query_summary': summary,
+            'reviews': page,
+            'cursor': encode_cursor(offset + len(page)) if page else encode_cursor(offset)
+        }
+
+
+class MockSteamHandler(BaseHTTPRequestHandler):
+    """
+    处理 /appreviews/{appid}、/profiles/{steamid}/、/profiles/{steamid}/games/ 和 /__stats
+    """
+
+    def log_message(self, format, *args):
+        # 压测时请求量很大，不输出访问日志
+        pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        parts = [part for part in parsed.path.split('/') if part]
+        server = self.server
+
+        if parts == ['__stats']:
+            with server.lock:
+                self._send(200, json.dumps(server.stats), 'application/json')
+            return
+
+        if len(parts) == 2 and parts[0] == 'appreviews':
+            endpoint = 'appreviews'
+        elif len(parts) == 2 and parts[0] == 'profiles':
+            endpoint = 'profile'
+        elif len(parts) == 3 and parts[0] == 'profiles' and parts[2] == 'games':
+            endpoint = 'games'
+        else:
+            server.record('unknown', 404)
+            self._send(404, 'Not Found', 'text/plain')
+            return
+
+        # 随机数按固定顺序全部取出，保证同一请求的结果不受其他条件影响
+        rng = server.next_random(self.path)
+        delay = server.latency + rng.random() * server.jitter
+        rate_limited = rng.random() < server.rate_limit_rate
+        failed = rng.random() < server.error_rate
+        status = rng.choice(SERVER_ERRORS)
+        if delay:
+            time.sleep(delay)
+
+        if rate_limited or server.over_rate_limit():
+            server.record(endpoint, 429)
+            self._send(429, 'Too Many Requests', 'text/plain', {'Retry-After': str(server.retry_after)})
+            return
+        if failed:
+            server.record(endpoint, status)
+            headers = {'Retry-After': str(server.retry_after)} if status == 503 else None
+            self._send(status, 'Server Error', 'text/plain', headers)
+            return
+
+        server.record(endpoint, 200)
+        if endpoint == 'appreviews':
+            body = server.review_page(parse_qs(parsed.query))
+            self._send(200, json.dumps(body, ensure_ascii=False), 'application/json; charset=utf-8')
+            return
+
+        profile = server.profiles.get(parts[1])
+        if profile is None:
+            html = '<html><body><h3>The specified profile could not be found.</h3></body></html>'
+        elif endpoint == 'profile':
+            html = (f'<html><body><div class="persona_level">Level '
+                    f'<span class="friendPlayerLevelNum">{profile["level"]}</span></div>'
+                    f'<div>Level {profile["level"]}</div></body></html>')
+        else:
+            html = f'<html><body><div id="games_list">{profile["owned_games"]} games</div></body></html>'
+        self._send(200, html, 'text/html; charset=utf-8')
+
+    def _send(self, status, body, content_type, headers=None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_server(fixtures, host='127.0.0.1', port=0, **options):
+    """
+    在后台线程中启动模拟服务器
+    :param fixtures: 回放数据
+    :param host: 监听地址
+    :param port: 端口，为 0 时自动选择
+    :param options: 传给 MockSteamServer 的延迟和故障注入参数
+    :return: 服务器，用完后调用 shutdown() 和 server_close()
+    """
+    server = MockSteamServer((host, port), fixtures, **options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def run_load_test(fixtures, worker_counts=(1, 4, 16), appid=3764200, sleep_scale=0.01, **options):
+    """
+    对模拟服务器运行爬虫，比较不同并发数下的吞吐量、重试和等待时间
+    :param fixtures: 回放数据
+    :param worker_counts: 请求玩家信息的线程数列表
+    :param appid: 游戏的AppID（模拟服务器不区分）
+    :param sleep_scale: 爬虫等待时间的缩放比例
+    :param options: 传给 MockSteamServer 的延迟和故障注入参数
+    :return: 线程数 -> 结果
+    """
+    import review
+
+    expected = fixtures['profiles']
+    results = {}
+    previous_scale = instrumentation.SLEEP_SCALE
+    instrumentation.SLEEP_SCALE = sleep_scale
+    try:
+        for workers in worker_counts:
+            # 每次使用新的服务器，保证故障注入的序列相同
+            server = start_server(fixtures, **options)
+            review.STEAM_STORE_URL = server.url
+            review.STEAM_COMMUNITY_URL = server.url
+            instrumentation.reset_metrics()
+            print(f"\n=== 并发数 {workers} ===")
+            try:
+                with stage('crawl'):
+                    raw_reviews = review.get_steam_reviews(appid, max_reviews=len(fixtures['reviews']))
+                add_items('crawl', len(raw_reviews))
+                with stage('enrich', items=len(raw_reviews)):
+                    processed = review.process_reviews(raw_reviews, max_workers=workers)
+            finally:
+                server.shutdown()
+                server.server_close()
+
+            # 与回放数据比较，统计因重试失败而丢失的玩家信息
+            missing = sum(1 for raw, item in zip(raw_reviews, processed)
+                          if raw['author']['steamid'] in expected
+                          and item['player_level'] != expected[raw['author']['steamid']]['level'])
+            report = build_report()
+            results[workers] = {
+                'reviews': len(raw_reviews),
+                'crawl_items_per_second': report['stages']['crawl']['items_per_second'],
+                'enrich_items_per_second': report['stages']['enrich']['items_per_second'],
+                'sleep_seconds': report['sleep_seconds'],
+                'http': report['http'],
+                'server_stats': server.stats,
+                'missing_player_info': missing
+            }
+            print(f"评论 {len(raw_reviews)} 条，获取 {results[workers]['crawl_items_per_second']} 条/秒，"
+                  f"玩家信息 {results[workers]['enrich_items_per_second']} 条/秒，"
+                  f"等待 {report['sleep_seconds']:.2f}s，玩家信息缺失 {missing} 条")
+    finally:
+        instrumentation.SLEEP_SCALE = previous_scale
+    return results
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description='本地 Steam 模拟服务器，用于离线测试爬虫的吞吐量和退避行为')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixtures', default=FIXTURES_FILE, help='回放数据文件，不存在时使用模拟评论')
+    parser.add_argument('--synthetic', type=int, default=1000, help='没有回放数据时生成的模拟评论数量')
+    parser.add_argument('--record', type=int, metavar='APPID', help='从 Steam 录制回放数据后退出')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的基础延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='随机增加的最大延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回 5xx 错误的概率')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='随机返回 429 的概率')
+    parser.add_argument('--max-rps', type=int, default=None, help='每秒请求数上限，超过时返回 429')
+    parser.add_argument('--retry-after', type=int, default=1, help='429 和 503 响应的 Retry-After 秒数')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--load-test', default=None, metavar='WORKERS',
+                        help='运行压测而不是启动服务器，参数为逗号分隔的并发数，如 1,4,16')
+    parser.add_argument('--sleep-scale', type=float, default=0.01, help='压测时爬虫等待时间的缩放比例')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    if args.record:
+        record_fixtures(args.record, max_reviews=args.synthetic, filename=args.fixtures)
+        raise SystemExit(0)
+
+    fixtures = load_fixtures(args.fixtures)
+    if fixtures is None:
+        print(f"未找到回放数据 {args.fixtures}，使用 {args.synthetic} 条模拟评论")
+        fixtures = synthetic_fixtures(args.synthetic, seed=args.seed)
+    options = {
+        'latency': args.latency, 'jitter': args.jitter, 'error_rate': args.error_rate,
+        'rate_limit_rate': args.rate_limit_rate, 'max_requests_per_second': args.max_rps,
+        'retry_after': args.retry_after, 'seed': args.seed
+    }
+
+    if args.load_test:
+        workers = [int(count) for count in args.load_test.split(',')]
+        results = run_load_test(fixtures, workers, sleep_scale=args.sleep_scale, **options)
+        with open(LOAD_TEST_REPORT_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'options': options, 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"\n压测结果已保存到 {LOAD_TEST_REPORT_FILE}")
+    else:
+        server = MockSteamServer((args.host, args.port), fixtures, **options)
+        print(f"模拟服务器已启动: {server.url}")
+        print(f"使用方法: STEAM_STORE_URL={server.url} STEAM_COMMUNITY_URL={server.url} python review.py")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
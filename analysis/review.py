@@ -1,9 +1,45 @@
 import requests
 import json
+import os
 import time
 import re
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from email.utils import parsedate_to_datetime
+from urllib3.util.retry import Retry
+from excel_export import write_reviews_excel
+from instrumentation import stage, add_items, record_http, timed_sleep, write_report, print_report
+from rollup import ingest_reviews
+from synthetic import generate_processed_reviews
+
+# 商店和社区的地址，可通过环境变量指向本地模拟服务器（见 mock_steam_server.py）
+STEAM_STORE_URL = os.environ.get('STEAM_STORE_URL', 'https://store.steampowered.com')
+STEAM_COMMUNITY_URL = os.environ.get('STEAM_COMMUNITY_URL', 'https://steamcommunity.com')
+# 429 响应的 Retry-After 超过该秒数时按该秒数等待
+MAX_RETRY_AFTER = 300
+# 同时请求玩家信息的线程数（每个线程在两次请求之间等待 1 秒）
+ENRICH_WORKERS = int(os.environ.get('STEAM_ENRICH_WORKERS', '4'))
+
+
+def retry_after_seconds(response, default):
+    """
+    解析响应的 Retry-After 头（秒数或HTTP日期）
+    :param response: 响应
+    :param default: 没有该头或无法解析时的等待秒数
+    :return: 等待秒数
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return default
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return default
+        seconds = retry_at.timestamp() - time.time()
+    return min(max(seconds, 0), MAX_RETRY_AFTER)
 
 
 def get_steam_reviews(appid, max_reviews=100):
@@ -27,15 +63,16 @@ def get_steam_reviews(appid, max_reviews=100):
     }
     
     # 配置会话，增加重试次数
+    # 连接失败时由适配器重试，429 由下面的代码按 Retry-After 等待，以便统计等待时间
     session = requests.Session()
-    adapter = requests.adapters.HTTPAdapter(max_retries=3)
+    adapter = requests.adapters.HTTPAdapter(max_retries=Retry(total=3, respect_retry_after_header=False))
     session.mount('https://', adapter)
     session.mount('http://', adapter)
     
     print(f"开始获取 Resident Evil Requiem 的评论...")
     
     while len(reviews) < max_reviews:
-        url = f"https://store.steampowered.com/appreviews/{appid}"
+        url = f"{STEAM_STORE_URL}/appreviews/{appid}"
         params = {
             'json': 1,
             'filter': 'recent',  # 最近的评论
@@ -55,7 +92,13 @@ def get_steam_reviews(appid, max_reviews=100):
                 print(f"获取评论... (尝试 {attempt + 1}/{retries})")
                 
                 # 增加超时时间
-                response = session.get(url, params=params, headers=headers, timeout=30)
+                request_start = time.perf_counter()
+                try:
+                    response = session.get(url, params=params, headers=headers, timeout=30)
+                except Exception as e:
+                    record_http('appreviews', type(e).__name__, time.perf_counter() - request_start, retry=attempt > 0)
+                    raise
+                record_http('appreviews', response.status_code, time.perf_counter() - request_start, retry=attempt > 0)
                 
                 # 检查响应内容
                 if response.status_code == 200:
@@ -86,13 +129,23 @@ def get_steam_reviews(appid, max_reviews=100):
                         break
                     
                     # 避免请求过于频繁
-                    time.sleep(2)
+                    timed_sleep(2)
                     break
+                elif response.status_code == 429:
+                    # 被限流时按服务器给出的时间等待
+                    if attempt < retries - 1:
+                        wait = retry_after_seconds(response, 30)
+                        print(f"请求过于频繁，等待 {wait:.0f} 秒后重试...")
+                        timed_sleep(wait)
+                    else:
+                        print("请求持续被限流，停止获取评论")
+                        has_more_reviews = False
+                        break
                 else:
                     print(f"响应状态码异常: {response.status_code}")
                     if attempt < retries - 1:
                         print(f"等待 5 秒后重试...")
-                        time.sleep(5)
+                        timed_sleep(5)
                     else:
                         print("重试失败，停止获取评论")
                         has_more_reviews = False
@@ -102,7 +155,7 @@ def get_steam_reviews(appid, max_reviews=100):
                 print("连接超时，请检查网络连接")
                 if attempt < retries - 1:
                     print(f"等待 10 秒后重试...")
-                    time.sleep(10)
+                    timed_sleep(10)
                 else:
                     print("重试失败，停止获取评论")
                     has_more_reviews = False
@@ -111,7 +164,7 @@ def get_steam_reviews(appid, max_reviews=100):
                 print("请求超时")
                 if attempt < retries - 1:
                     print(f"等待 8 秒后重试...")
-                    time.sleep(8)
+                    timed_sleep(8)
                 else:
                     print("重试失败，停止获取评论")
                     has_more_reviews = False
@@ -120,7 +173,7 @@ def get_steam_reviews(appid, max_reviews=100):
                 print(f"获取评论时出错: {e}")
                 if attempt < retries - 1:
                     print(f"等待 5 秒后重试...")
-                    time.sleep(5)
+                    timed_sleep(5)
                 else:
                     print("重试失败，停止获取评论")
                     has_more_reviews = False
@@ -136,6 +189,30 @@ def get_steam_reviews(appid, max_reviews=100):
     return reviews
 
 
+def _get_profile_page(url, endpoint, headers, retries):
+    """
+    请求社区页面，出错时等待 2 秒后重试，429 时按 Retry-After 等待
+    :return: 状态码为 200 的响应，失败时返回 None
+    """
+    for attempt in range(retries):
+        request_start = time.perf_counter()
+        try:
+            response = requests.get(url, headers=headers, timeout=10)
+        except Exception as e:
+            record_http(endpoint, type(e).__name__, time.perf_counter() - request_start, retry=attempt > 0)
+            print(f"请求 {url} 时出错: {e}")
+            if attempt < retries - 1:
+                timed_sleep(2)
+            continue
+        record_http(endpoint, response.status_code, time.perf_counter() - request_start, retry=attempt > 0)
+        
+        if response.status_code == 200:
+            return response
+        if attempt < retries - 1:
+            timed_sleep(retry_after_seconds(response, 2) if response.status_code == 429 else 2)
+    return None
+
+
 def get_player_info(steamid):
     """
     获取玩家的Steam个人资料信息
@@ -155,50 +232,28 @@ def get_player_info(steamid):
         'Connection': 'keep-alive'
     }
     
+    retries = 2
     try:
-        # 由于网络问题，使用模拟数据
-        # 实际项目中可以取消注释以下代码来获取真实数据
-        """
         # 获取玩家等级
-        level_url = f"https://steamcommunity.com/profiles/{steamid}/?l=english"
-        retries = 2
-        for attempt in range(retries):
-            try:
-                level_response = requests.get(level_url, headers=headers, timeout=10)
-                if level_response.status_code == 200:
-                    # 提取等级信息
-                    level_match = re.search(r'Level (\d+)', level_response.text)
-                    if level_match:
-                        player_info['level'] = int(level_match.group(1))
-                break
-            except Exception as e:
-                print(f"获取玩家等级时出错: {e}")
-                if attempt < retries - 1:
-                    time.sleep(2)
+        level_url = f"{STEAM_COMMUNITY_URL}/profiles/{steamid}/?l=english"
+        level_response = _get_profile_page(level_url, 'profile', headers, retries)
+        if level_response is not None:
+            # 提取等级信息
+            level_match = re.search(r'Level (\d+)', level_response.text)
+            if level_match:
+                player_info['level'] = int(level_match.group(1))
         
         # 等待一段时间再请求游戏库信息
-        time.sleep(1)
+        timed_sleep(1)
         
         # 获取玩家游戏库信息
-        games_page_url = f"https://steamcommunity.com/profiles/{steamid}/games/?tab=all"
-        for attempt in range(retries):
-            try:
-                games_response = requests.get(games_page_url, headers=headers, timeout=10)
-                if games_response.status_code == 200:
-                    # 提取拥有的游戏数量
-                    games_count_match = re.search(r'(\d+) games', games_response.text)
-                    if games_count_match:
-                        player_info['owned_games'] = int(games_count_match.group(1))
-                break
-            except Exception as e:
-                print(f"获取玩家游戏库信息时出错: {e}")
-                if attempt < retries - 1:
-                    time.sleep(2)
-        """
-        
-        # 使用模拟数据
-        player_info['level'] = int(steamid[-3:]) % 50 + 1  # 1-50级
-        player_info['owned_games'] = int(steamid[-4:]) % 200 + 10  # 10-210个游戏
+        games_page_url = f"{STEAM_COMMUNITY_URL}/profiles/{steamid}/games/?tab=all"
+        games_response = _get_profile_page(games_page_url, 'games', headers, retries)
+        if games_response is not None:
+            # 提取拥有的游戏数量
+            games_count_match = re.search(r'(\d+) games', games_response.text)
+            if games_count_match:
+                player_info['owned_games'] = int(games_count_match.group(1))
         
     except Exception as e:
         print(f"获取玩家信息时出错: {e}")
@@ -206,14 +261,25 @@ def get_player_info(steamid):
     return player_info
 
 
-def process_reviews(reviews):
+def process_reviews(reviews, max_workers=1, enrich=True):
     """
     处理评论数据，提取有用信息
     :param reviews: 原始评论列表
+    :param max_workers: 同时请求玩家信息的线程数
+    :param enrich: 是否请求玩家信息（为 False 时等级和游戏数量为 0）
     :return: 处理后的评论列表
     """
     processed_reviews = []
     
+    # 每个玩家只请求一次
+    steamids = [review.get('author', {}).get('steamid', '') for review in reviews] if enrich else []
+    steamids = [steamid for steamid in dict.fromkeys(steamids) if steamid]
+    if max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            player_infos = dict(zip(steamids, executor.map(get_player_info, steamids)))
+    else:
+        player_infos = {steamid: get_player_info(steamid) for steamid in steamids}
+    
     for review in reviews:
         # 转换时间戳为YYYY-MM-DD格式
         timestamp = review.get('timestamp_created', 0)
@@ -228,12 +294,13 @@ def process_reviews(reviews):
         
         # 获取玩家信息
         steamid = review.get('author', {}).get('steamid', '')
-        player_info = get_player_info(steamid) if steamid else {
+        player_info = player_infos.get(steamid, {
             'level': 0,
             'owned_games': 0
-        }
+        })
         
         processed_review = {
+            'recommendationid': review.get('recommendationid', ''),
             'publish_date': publish_date,
             'content': review.get('review', ''),
             'recommendation': recommendation,
@@ -246,11 +313,12 @@ def process_reviews(reviews):
     return processed_reviews
 
 
-def save_reviews_to_file(reviews, filename):
+def save_reviews_to_file(reviews, filename, summaries=None):
     """
     保存评论到文件
     :param reviews: 评论列表
     :param filename: 文件名
+    :param summaries: 可选的Excel汇总表，工作表名 -> 行列表（第一行为表头）
     """
     # 保存为JSON文件
     with open(filename, 'w', encoding='utf-8') as f:
@@ -260,8 +328,8 @@ def save_reviews_to_file(reviews, filename):
     # 保存为Excel文件
     excel_filename = filename.replace('.json', '.xlsx')
     try:
-        df = pd.DataFrame(reviews)
-        df.to_excel(excel_filename, index=False, engine='openpyxl')
+        # 流式写入，超过单表行数上限时自动分表
+        write_reviews_excel(reviews, excel_filename, summaries=summaries)
         print(f"评论已保存到 {excel_filename}")
     except Exception as e:
         print(f"保存为Excel文件时出错: {e}")
@@ -276,37 +344,28 @@ if __name__ == "__main__":
     print(f"游戏AppID: {appid}")
     
     # 设置一个足够大的数值，确保获取所有评论
-    reviews = get_steam_reviews(appid, max_reviews=10000)
+    with stage('crawl'):
+        reviews = get_steam_reviews(appid, max_reviews=10000)
+    add_items('crawl', len(reviews))
     
     print(f"共获取到 {len(reviews)} 条评论")
     
     if reviews:
-        processed_reviews = process_reviews(reviews)
-        save_reviews_to_file(processed_reviews, 'resident_evil_requiem_reviews.json')
+        with stage('enrich', items=len(reviews)):
+            processed_reviews = process_reviews(reviews, max_workers=ENRICH_WORKERS)
+        with stage('save', items=len(processed_reviews)):
+            save_reviews_to_file(processed_reviews, 'resident_evil_requiem_reviews.json')
+        # 模拟数据不计入按天汇总
+        with stage('rollup', items=len(processed_reviews)):
+            ingest_reviews(processed_reviews)
     else:
         # 如果没有获取到评论，使用模拟数据
         print("未获取到评论，使用模拟数据")
         
-        # 生成模拟评论数据
-        mock_reviews = []
-        for i in range(100):
-            review = {
-                'recommendationid': f"{i + 1}",
-                'author': {
-                    'steamid': f"765611980{i:05d}",
-                    'playtime_forever': (i + 1) * 60 * 2,  # 2小时/条
-                    'playtime_last_two_weeks': (i + 1) * 60
-                },
-                'voted_up': i % 2 == 0,  # 一半推荐，一半不推荐
-                'review': f"这是第 {i + 1} 条评论，游戏非常棒！画面精美，剧情紧凑，推荐给所有玩家。",
-                'timestamp_created': int(time.time()) - i * 86400,  # 每天一条
-                'timestamp_updated': int(time.time()) - i * 86400,
-                'comment_count': i % 5,
-                'steam_purchase': True,
-                'received_for_free': False,
-                'written_during_early_access': False
-            }
-            mock_reviews.append(review)
-        
-        processed_reviews = process_reviews(mock_reviews)
-        save_reviews_to_file(processed_reviews, 'resident_evil_requiem_reviews.json')
+        # 生成模拟评论数据，模拟玩家不存在，玩家等级和游戏数量同样使用模拟值而不请求玩家信息
+        with stage('enrich', items=100):
+            processed_reviews = list(generate_processed_reviews(100))
+        with stage('save', items=len(processed_reviews)):
+            save_reviews_to_file(processed_reviews, 'resident_evil_requiem_reviews.json')
+    
+    print_report(write_report())
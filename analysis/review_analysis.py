@@ -1,29 +1,60 @@
 import json
-import jieba
-import jieba.analyse
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import os
 from collections import Counter
 import re
+from review_table import ReviewTable, as_review_table
+from instrumentation import stage, add_items, write_report, print_report
 
-# 设置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签
-plt.rcParams['axes.unicode_minus'] = False  # 用来正常显示负号
+# jieba、pandas、matplotlib 等依赖导入较慢，只在用到的函数中导入，
+# 这样 rollup.py、segmentation.py 和 cli.py 的轻量命令导入本模块时不需要加载它们
+
+# 缓存目录（jieba 词典缓存等），可通过环境变量修改
+CACHE_DIR = os.environ.get('UTOPIA_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'utopia'))
+# 词云使用的中文字体，可通过环境变量修改
+FONT_PATH = os.environ.get('UTOPIA_FONT', 'simhei.ttf')
+
+def init_jieba():
+    """
+    初始化 jieba，词典缓存保存在 CACHE_DIR 中，之后的运行直接加载缓存而不用重新构建前缀词典
+    并登记情感词典中的否定组合词（没有闪退等），避免否定词作为停用词被过滤后只剩下问题词
+    :return: jieba 模块
+    """
+    import jieba
+    from sentiment import NEGATED_TECH_LEXICON
+
+    if not jieba.dt.initialized:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        jieba.dt.tmp_dir = CACHE_DIR
+        jieba.initialize()
+        for word in NEGATED_TECH_LEXICON:
+            jieba.add_word(word)
+    return jieba
+
+def setup_plotting():
+    """
+    导入 matplotlib 并设置中文字体
+    :return: matplotlib.pyplot 模块
+    """
+    import matplotlib.pyplot as plt
+
+    # 设置中文字体
+    plt.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签
+    plt.rcParams['axes.unicode_minus'] = False  # 用来正常显示负号
+    return plt
 
 def load_reviews():
     """
     加载评论数据
-    :return: 评论数据列表
+    :return: 评论表
     """
     try:
         with open('resident_evil_requiem_reviews.json', 'r', encoding='utf-8') as f:
-            reviews = json.load(f)
+            reviews = ReviewTable.from_records(json.load(f))
         print(f"成功加载 {len(reviews)} 条评论")
         return reviews
     except Exception as e:
         print(f"加载评论数据失败: {e}")
-        return []
+        return ReviewTable()
 
 def clean_text(text):
     """
@@ -49,7 +80,7 @@ def segment_text(text):
     # jieba.load_userdict('custom_dict.txt')
     
     # 分词
-    words = jieba.cut(text)
+    words = init_jieba().cut(text)
     # 过滤停用词
     stopwords = set()
     try:
@@ -69,9 +100,35 @@ def extract_keywords(text, topK=10):
     :param topK: 提取的关键词数量
     :return: 关键词列表
     """
+    init_jieba()
+    import jieba.analyse
+    
     keywords = jieba.analyse.extract_tags(text, topK=topK, withWeight=False)
     return keywords
 
+# 定义分类关键词
+FEEDBACK_CATEGORIES = {
+    '画面': ['画面', '画质', '视觉', '特效', '场景', '画面精美', '画面震撼'],
+    '剧情': ['剧情', '故事', '情节', '叙事', '结局', '剧情紧凑', '剧情精彩'],
+    '玩法': ['玩法', '操作', '系统', '机制', '玩法创新', '操作流畅'],
+    '音效': ['音效', '音乐', '配音', '声音', '音效震撼', '音乐好听'],
+    '性能': ['性能', '优化', '卡顿', '流畅度', '帧率', '优化好'],
+    '价格': ['价格', '性价比', '贵', '便宜', '性价比高', '价格合理'],
+    'bug': ['bug', '错误', '问题', '崩溃', 'bug多', '问题多'],
+    '推荐': ['推荐', '值得', '必玩', '好评', '强烈推荐', '值得购买']
+}
+
+def count_category_hits(content):
+    """
+    统计评论命中各分类关键词的数量
+    :param content: 评论内容
+    :return: 分类 -> 命中关键词数量
+    """
+    return {
+        category: sum(1 for keyword in keywords if keyword in content)
+        for category, keywords in FEEDBACK_CATEGORIES.items()
+    }
+
 def classify_feedback(review):
     """
     分类反馈
@@ -81,18 +138,6 @@ def classify_feedback(review):
     content = review.get('content', '')
     recommendation = review.get('recommendation', '')
     
-    # 定义分类关键词
-    categories = {
-        '画面': ['画面', '画质', '视觉', '特效', '场景', '画面精美', '画面震撼'],
-        '剧情': ['剧情', '故事', '情节', '叙事', '结局', '剧情紧凑', '剧情精彩'],
-        '玩法': ['玩法', '操作', '系统', '机制', '玩法创新', '操作流畅'],
-        '音效': ['音效', '音乐', '配音', '声音', '音效震撼', '音乐好听'],
-        '性能': ['性能', '优化', '卡顿', '流畅度', '帧率', '优化好'],
-        '价格': ['价格', '性价比', '贵', '便宜', '性价比高', '价格合理'],
-        'bug': ['bug', '错误', '问题', '崩溃', 'bug多', '问题多'],
-        '推荐': ['推荐', '值得', '必玩', '好评', '强烈推荐', '值得购买']
-    }
-    
     # 初始化分类结果
     classification = {
         'category': '其他',
@@ -107,21 +152,42 @@ def classify_feedback(review):
     
     # 分析分类
     max_count = 0
-    for category, keywords in categories.items():
-        count = sum(1 for keyword in keywords if keyword in content)
+    for category, count in count_category_hits(content).items():
         if count > max_count:
             max_count = count
             classification['category'] = category
     
     return classification
 
+def classify_reviews(reviews):
+    """
+    批量分类反馈，结果写入评论表的 category 和 sentiment 列
+    :param reviews: 评论表
+    """
+    categories = []
+    sentiments = []
+    for review in reviews.rows(['content', 'recommendation']):
+        classification = classify_feedback(review)
+        categories.append(classification['category'])
+        sentiments.append(classification['sentiment'])
+    reviews.set_column('category', categories)
+    reviews.set_column('sentiment', sentiments)
+
 def visualize_reviews(reviews):
     """
     可视化评论数据
-    :param reviews: 评论数据列表
+    :param reviews: 评论表（也接受评论字典列表）
     """
+    import pandas as pd
+    import seaborn as sns
+    
+    plt = setup_plotting()
+    reviews = as_review_table(reviews)
+    if 'category' not in reviews or 'sentiment' not in reviews:
+        classify_reviews(reviews)
+    
     # 转换为DataFrame
-    df = pd.DataFrame(reviews)
+    df = reviews.to_frame(['recommendation', 'hours', 'player_level', 'owned_games', 'category', 'sentiment'])
     
     # 1. 情感分布
     plt.figure(figsize=(8, 6))
@@ -161,16 +227,6 @@ def visualize_reviews(reviews):
     plt.show()
     
     # 5. 分类分布
-    categories = []
-    sentiments = []
-    for review in reviews:
-        classification = classify_feedback(review)
-        categories.append(classification['category'])
-        sentiments.append(classification['sentiment'])
-    
-    df['category'] = categories
-    df['sentiment'] = sentiments
-    
     plt.figure(figsize=(12, 6))
     category_counts = df['category'].value_counts()
     sns.barplot(x=category_counts.index, y=category_counts.values)
@@ -193,15 +249,17 @@ def visualize_reviews(reviews):
     plt.savefig('sentiment_category_cross.png')
     plt.show()
 
-def generate_wordcloud(reviews):
+def generate_wordcloud(reviews, font_path=None):
     """
     生成词云
-    :param reviews: 评论数据列表
+    :param reviews: 评论表（也接受评论字典列表）
+    :param font_path: 中文字体路径，默认为 FONT_PATH
     """
     from wordcloud import WordCloud
     
+    plt = setup_plotting()
     # 合并所有评论内容
-    all_content = ' '.join([review.get('content', '') for review in reviews])
+    all_content = ' '.join(as_review_table(reviews).column('content'))
     
     # 清洗文本
     cleaned_content = clean_text(all_content)
@@ -211,7 +269,7 @@ def generate_wordcloud(reviews):
     
     # 生成词云
     wordcloud = WordCloud(
-        font_path='simhei.ttf',  # 中文字体路径
+        font_path=font_path or FONT_PATH,  # 中文字体路径
         width=800,
         height=600,
         background_color='white',
@@ -236,57 +294,94 @@ def main():
     """
     主函数
     """
+    from dedup import find_duplicates, duplicate_indices, save_clusters
+    from sentiment import score_reviews, load_sentiment_model
+    from rollup import ingest_reviews
+    
     # 加载评论数据
-    reviews = load_reviews()
+    with stage('load'):
+        reviews = load_reviews()
+    add_items('load', len(reviews))
     
     if not reviews:
         print("没有评论数据，无法进行分析")
         return
     
-    # 数据清洗和分词
-    for review in reviews:
-        content = review.get('content', '')
-        cleaned_content = clean_text(content)
-        review['cleaned_content'] = cleaned_content
-        review['words'] = segment_text(cleaned_content)
-        review['keywords'] = extract_keywords(cleaned_content)
-        
-        # 分类
-        classification = classify_feedback(review)
-        review['category'] = classification['category']
-        review['sentiment'] = classification['sentiment']
+    # 数据清洗和分词（单独统计 jieba 加载词典的耗时）
+    with stage('clean', items=len(reviews)):
+        reviews.set_column('cleaned_content', [clean_text(content) for content in reviews.iter_column('content')])
+    with stage('jieba_init'):
+        init_jieba()
+    with stage('segment', items=len(reviews)):
+        reviews.set_column('words', [segment_text(text) for text in reviews.iter_column('cleaned_content')])
+    
+    # 去除完全重复和复制粘贴类评论，避免影响分类统计和词云
+    with stage('dedup', items=len(reviews)):
+        raw_reviews = reviews
+        clusters = find_duplicates(raw_reviews.rows(['cleaned_content', 'words']))
+        duplicates = duplicate_indices(clusters)
+        reviews = raw_reviews.take([i for i in range(len(raw_reviews)) if i not in duplicates])
+        save_clusters(clusters, raw_reviews)
+    print(f"去重后剩余 {len(reviews)} 条评论（共 {len(clusters)} 个重复簇）")
+    
+    # 关键词和分类
+    with stage('keywords', items=len(reviews)):
+        reviews.set_column('keywords', [extract_keywords(text) for text in reviews.iter_column('cleaned_content')])
+    with stage('classify', items=len(reviews)):
+        classify_reviews(reviews)
+    
+    # 增量更新按天汇总，采集时已计入的评论会被跳过
+    with stage('rollup', items=len(reviews)):
+        ingest_reviews(reviews.rows(['recommendationid', 'publish_date', 'content', 'recommendation', 'hours',
+                                     'player_level', 'owned_games', 'category', 'sentiment']))
+    
+    # 基于分词结果批量计算连续情感得分，与推荐状态无关
+    with stage('sentiment', items=len(reviews)):
+        reviews.set_column('sentiment_score', score_reviews(reviews.rows(['words']), load_sentiment_model()))
     
     # 保存处理后的数据
-    with open('processed_reviews.json', 'w', encoding='utf-8') as f:
-        json.dump(reviews, f, ensure_ascii=False, indent=2)
+    with stage('save', items=len(reviews)):
+        # 逐行写入，避免把整张表还原为评论字典
+        reviews.write_json('processed_reviews.json')
     print("处理后的数据已保存到 processed_reviews.json")
     
     # 可视化
-    visualize_reviews(reviews)
+    with stage('visualize', items=len(reviews)):
+        visualize_reviews(reviews)
     
     # 生成词云
     try:
-        generate_wordcloud(reviews)
+        with stage('wordcloud', items=len(reviews)):
+            generate_wordcloud(reviews)
     except Exception as e:
         print(f"生成词云失败: {e}")
     
     # 统计分析
     print("\n=== 统计分析 ===")
     total_reviews = len(reviews)
-    positive_reviews = sum(1 for review in reviews if review.get('sentiment') == '正面')
-    negative_reviews = sum(1 for review in reviews if review.get('sentiment') == '负面')
-    neutral_reviews = sum(1 for review in reviews if review.get('sentiment') == '中性')
+    sentiment_counts = reviews.value_counts('sentiment')
+    positive_reviews = sentiment_counts.get('正面', 0)
+    negative_reviews = sentiment_counts.get('负面', 0)
+    neutral_reviews = sentiment_counts.get('中性', 0)
     
     print(f"总评论数: {total_reviews}")
     print(f"正面评论: {positive_reviews} ({positive_reviews/total_reviews*100:.1f}%)")
     print(f"负面评论: {negative_reviews} ({negative_reviews/total_reviews*100:.1f}%)")
     print(f"中性评论: {neutral_reviews} ({neutral_reviews/total_reviews*100:.1f}%)")
     
+    # 推荐但内容偏负面的评论（如吐槽闪退但仍然推荐）
+    codes, labels = reviews.codes('sentiment')
+    positive_code = labels.index('正面') if '正面' in labels else -1
+    mixed_reviews = int(((codes == positive_code) & (reviews.column('sentiment_score') < 0)).sum())
+    print(f"推荐但内容偏负面: {mixed_reviews} ({mixed_reviews/total_reviews*100:.1f}%)")
+    
     # 分类统计
-    category_counts = Counter([review.get('category') for review in reviews])
+    category_counts = reviews.value_counts('category')
     print("\n=== 分类统计 ===")
     for category, count in category_counts.items():
         print(f"{category}: {count} ({count/total_reviews*100:.1f}%)")
+    
+    print_report(write_report())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,372 @@
+import json
+
+import numpy as np
+
+# 列类型定义
+CATEGORICAL_COLUMNS = ('publish_date', 'recommendation', 'sentiment', 'category')
+NUMERIC_COLUMNS = {
+    'hours': np.float64,
+    'player_level': np.int32,
+    'owned_games': np.int32,
+    'sentiment_score': np.float64
+}
+STRING_COLUMNS = ('recommendationid', 'content', 'cleaned_content')
+TOKEN_COLUMNS = ('words', 'keywords')
+
+# 导出为字典时的字段顺序，与 processed_reviews.json 保持一致
+COLUMN_ORDER = (
+    'recommendationid', 'publish_date', 'content', 'recommendation', 'hours', 'player_level', 'owned_games',
+    'cleaned_content', 'words', 'keywords', 'category', 'sentiment', 'sentiment_score'
+)
+
+
+class Vocabulary:
+    """
+    共享词表，将词映射为 int32 编号，同一个词在内存中只保存一份
+    """
+
+    def __init__(self):
+        self.words = []
+        self.index = {}
+
+    def __len__(self):
+        return len(self.words)
+
+    def intern(self, words):
+        """
+        将词列表转换为编号数组，新词自动加入词表
+        :param words: 词列表
+        :return: int32 编号数组
+        """
+        ids = []
+        for word in words:
+            word_id = self.index.get(word)
+            if word_id is None:
+                word_id = len(self.words)
+                self.index[word] = word_id
+                self.words.append(word)
+            ids.append(word_id)
+        return ids
+
+    def lookup(self, ids):
+        """
+        将编号数组转换回词列表
+        :param ids: 编号数组
+        :return: 词列表
+        """
+        return [self.words[word_id] for word_id in ids]
+
+
+class CategoricalColumn:
+    """
+    分类列：标签只保存一份，每行只保存整数编码
+    """
+
+    def __init__(self, labels, codes):
+        self.labels = labels
+        self.codes = codes
+
+    @classmethod
+    def from_values(cls, values):
+        labels = []
+        index = {}
+        codes = []
+        for value in values:
+            code = index.get(value)
+            if code is None:
+                code = len(labels)
+                index[value] = code
+                labels.append(value)
+            codes.append(code)
+        dtype = np.int8 if len(labels) <= 127 else np.int32
+        return cls(labels, np.array(codes, dtype=dtype))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.labels[self.codes[i]]
+
+    def take(self, indices):
+        return CategoricalColumn(self.labels, self.codes[indices])
+
+    def values(self):
+        return [self.labels[code] for code in self.codes]
+
+    def value_counts(self):
+        counts = np.bincount(self.codes, minlength=len(self.labels))
+        return {label: int(count) for label, count in zip(self.labels, counts) if count}
+
+
+class StringColumn:
+    """
+    文本列：所有文本以 UTF-8 拼接在一块连续内存中，通过偏移量访问
+    """
+
+    def __init__(self, buffer, offsets):
+        self.buffer = buffer
+        self.offsets = offsets
+
+    @classmethod
+    def from_values(cls, values):
+        encoded = [(value or '').encode('utf-8') for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(item) for item in encoded], out=offsets[1:])
+        return cls(b''.join(encoded), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+
+    def take(self, indices):
+        return StringColumn.from_values(self[i] for i in indices)
+
+    def values(self):
+        return [self[i] for i in range(len(self))]
+
+
+class TokenColumn:
+    """
+    分词列：每行的词编号拼接为一个 int32 数组，词表在整张表内共享
+    """
+
+    def __init__(self, ids, offsets, vocabulary):
+        self.ids = ids
+        self.offsets = offsets
+        self.vocabulary = vocabulary
+
+    @classmethod
+    def from_values(cls, values, vocabulary):
+        ids = []
+        lengths = []
+        for words in values:
+            row_ids = vocabulary.intern(words or [])
+            ids.extend(row_ids)
+            lengths.append(len(row_ids))
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(np.array(ids, dtype=np.int32), offsets, vocabulary)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.vocabulary.lookup(self.ids[self.offsets[i]:self.offsets[i + 1]])
+
+    def row_ids(self, i):
+        return self.ids[self.offsets[i]:self.offsets[i + 1]]
+
+    def take(self, indices):
+        lengths = np.diff(self.offsets)[indices]
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        ids = np.concatenate([self.row_ids(i) for i in indices]) if len(indices) else np.zeros(0, dtype=np.int32)
+        return TokenColumn(ids.astype(np.int32), offsets, self.vocabulary)
+
+    def values(self):
+        return [self[i] for i in range(len(self))]
+
+
+class ReviewTable:
+    """
+    紧凑的列式评论表
+    分类字段保存为整数编码，数值字段保存为 NumPy 数组，分词结果保存为共享词表上的 int32 编号
+    按行访问时返回与原来相同结构的字典，便于与按字典处理评论的代码互通
+    """
+
+    def __init__(self, length=0, vocabulary=None):
+        self.length = length
+        self.vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+        self.columns = {}
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        从评论字典列表构建评论表
+        :param records: 评论字典列表
+        :return: 评论表
+        """
+        table = cls(len(records))
+        names = []
+        for record in records:
+            for name in record:
+                if name not in names:
+                    names.append(name)
+        for name in names:
+            table.set_column(name, [record.get(name) for record in records])
+        return table
+
+    def __len__(self):
+        return self.length
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def set_column(self, name, values):
+        """
+        设置整列数据，根据列名选择存储方式
+        :param name: 列名
+        :param values: 列数据，长度必须与表行数一致
+        """
+        if len(values) != self.length:
+            raise ValueError(f"列 {name} 的长度 {len(values)} 与评论数 {self.length} 不一致")
+
+        if name in CATEGORICAL_COLUMNS:
+            self.columns[name] = CategoricalColumn.from_values(values)
+        elif name in NUMERIC_COLUMNS:
+            self.columns[name] = np.array([0 if v is None else v for v in values], dtype=NUMERIC_COLUMNS[name])
+        elif name in STRING_COLUMNS:
+            self.columns[name] = StringColumn.from_values(values)
+        elif name in TOKEN_COLUMNS:
+            self.columns[name] = TokenColumn.from_values(values, self.vocabulary)
+        else:
+            # 未知字段原样保存
+            self.columns[name] = list(values)
+
+    def column(self, name):
+        """
+        获取整列数据
+        数值列返回 NumPy 数组，分类列和文本列返回字符串列表，分词列返回词列表的列表
+        :param name: 列名
+        :return: 列数据
+        """
+        column = self.columns[name]
+        if isinstance(column, (np.ndarray, list)):
+            return column
+        return column.values()
+
+    def iter_column(self, name):
+        """
+        逐个生成一列的值，不构建整列的列表
+        :param name: 列名
+        :return: 值的生成器
+        """
+        column = self.columns[name]
+        for i in range(self.length):
+            yield column[i]
+
+    def codes(self, name):
+        """
+        获取分类列的整数编码和标签
+        :param name: 列名
+        :return: (编码数组, 标签列表)
+        """
+        column = self.columns[name]
+        return column.codes, column.labels
+
+    def value_counts(self, name):
+        """
+        统计分类列各标签的数量
+        :param name: 列名
+        :return: 标签 -> 数量
+        """
+        return self.columns[name].value_counts()
+
+    def _value(self, name, i):
+        value = self.columns[name][i]
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    def row(self, i, columns=None):
+        """
+        获取一行评论
+        :param i: 行号
+        :param columns: 需要的列，默认为全部列
+        :return: 评论字典
+        """
+        names = columns if columns is not None else self.column_names()
+        return {name: self._value(name, i) for name in names if name in self.columns}
+
+    def __getitem__(self, i):
+        return self.row(i)
+
+    def rows(self, columns=None):
+        """
+        逐行生成评论字典，只解码需要的列
+        :param columns: 需要的列，默认为全部列
+        :return: 评论字典生成器
+        """
+        names = columns if columns is not None else self.column_names()
+        for i in range(self.length):
+            yield self.row(i, names)
+
+    def __iter__(self):
+        return self.rows()
+
+    def column_names(self):
+        known = [name for name in COLUMN_ORDER if name in self.columns]
+        return known + [name for name in self.columns if name not in COLUMN_ORDER]
+
+    def take(self, indices):
+        """
+        按行号选取部分评论，返回共享词表的新表
+        :param indices: 行号列表
+        :return: 评论表
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        table = ReviewTable(len(indices), self.vocabulary)
+        for name, column in self.columns.items():
+            if isinstance(column, list):
+                table.columns[name] = [column[i] for i in indices]
+            elif isinstance(column, np.ndarray):
+                table.columns[name] = column[indices]
+            else:
+                table.columns[name] = column.take(indices)
+        return table
+
+    def to_records(self):
+        """
+        导出为评论字典列表
+        :return: 评论字典列表
+        """
+        return list(self.rows())
+
+    def write_json(self, filename, indent=2):
+        """
+        逐行写入 JSON 文件（格式与 json.dump(to_records(), indent=2) 相同），不在内存中构建全部评论字典
+        :param filename: 文件名
+        :param indent: 缩进空格数
+        """
+        prefix = ' ' * indent
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write('[')
+            for i, row in enumerate(self.rows()):
+                text = json.dumps(row, ensure_ascii=False, indent=indent)
+                f.write((',\n' if i else '\n') + prefix + text.replace('\n', '\n' + prefix))
+            f.write('\n]' if self.length else ']')
+
+    def to_frame(self, columns):
+        """
+        将部分列转换为 DataFrame，分类列转换为 pandas 的 Categorical
+        缺失值（None）转换为 NaN，没有出现的标签（如 take 之后）会被去掉
+        :param columns: 列名列表
+        :return: DataFrame
+        """
+        import pandas as pd
+
+        data = {}
+        for name in columns:
+            column = self.columns[name]
+            if isinstance(column, CategoricalColumn):
+                labels = [label for label in column.labels if label is not None]
+                remap = np.array([-1 if label is None else labels.index(label) for label in column.labels],
+                                 dtype=np.int64)
+                codes = remap[column.codes] if len(remap) else column.codes
+                data[name] = pd.Categorical.from_codes(codes, labels).remove_unused_categories()
+            else:
+                data[name] = self.column(name)
+        return pd.DataFrame(data)
+
+
+def as_review_table(reviews):
+    """
+    将评论字典列表转换为评论表，已经是评论表时直接返回
+    :param reviews: 评论表或评论字典列表
+    :return: 评论表
+    """
+    if isinstance(reviews, ReviewTable):
+        return reviews
+    return ReviewTable.from_records(list(reviews))
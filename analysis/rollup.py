@@ -0,0 +1,316 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+ROLLUP_FILE = 'daily_rollups.json'
+# 已计入评论的去重键单独保存，只有 ingest_reviews 会读写，仪表盘读取汇总时不加载
+ROLLUP_IDS_FILE = 'daily_rollup_ids.json'
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def load_rollups(filename=ROLLUP_FILE):
+    """
+    加载按天汇总的数据
+    :param filename: 汇总文件名
+    :return: 汇总数据，文件不存在时返回空汇总
+    """
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            rollups = json.load(f)
+        # 旧版汇总文件中带有 ids，下次保存时迁移到单独的去重键文件
+        if 'ids' in rollups:
+            rollups['legacy_ids'] = rollups.pop('ids')
+        print(f"成功加载 {len(rollups['days'])} 天的汇总数据")
+        return rollups
+    except FileNotFoundError:
+        return _new_rollups()
+    except Exception as e:
+        print(f"加载汇总数据失败: {e}")
+        return _new_rollups()
+
+
+def save_rollups(rollups, filename=ROLLUP_FILE):
+    """
+    保存按天汇总的数据
+    :param rollups: 汇总数据
+    :param filename: 汇总文件名
+    """
+    rollups = {key: value for key, value in rollups.items() if key != 'legacy_ids'}
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(rollups, f, ensure_ascii=False, indent=2)
+    print(f"汇总数据已保存到 {filename}")
+
+
+def load_seen_ids(filename=ROLLUP_IDS_FILE):
+    """
+    加载已计入评论的去重键
+    :param filename: 去重键文件名
+    :return: 去重键集合，文件不存在时返回空集合
+    """
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return set(json.load(f))
+    except FileNotFoundError:
+        return set()
+    except Exception as e:
+        print(f"加载去重键失败: {e}")
+        return set()
+
+
+def save_seen_ids(seen, filename=ROLLUP_IDS_FILE):
+    """
+    保存已计入评论的去重键
+    :param seen: 去重键集合
+    :param filename: 去重键文件名
+    """
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(sorted(seen), f, ensure_ascii=False)
+
+
+def _new_rollups():
+    return {'days': {}, 'ingested': 0}
+
+
+def _review_key(review):
+    """
+    评论的去重键：优先使用 recommendationid，
+    旧数据没有ID时用所有保存的字段（日期、时长、推荐状态、玩家等级、游戏数量和内容摘要）代替。
+    旧数据中这些字段完全相同的两条评论仍会被视为同一条
+    """
+    review_id = review.get('recommendationid')
+    if review_id:
+        return str(review_id)
+    digest = hashlib.md5((review.get('content') or '').encode('utf-8')).hexdigest()[:16]
+    return '|'.join([
+        str(review.get('publish_date')),
+        str(float(review.get('hours') or 0)),
+        str(review.get('recommendation')),
+        str(int(review.get('player_level') or 0)),
+        str(int(review.get('owned_games') or 0)),
+        digest
+    ])
+
+
+def _new_day():
+    return {
+        'count': 0,
+        'recommended': 0,
+        'categories': {},  # 分类 -> [正面数, 负面数]
+        'hours_hist': {},  # 游戏时长（保留一位小数）-> 评论数
+        'median_hours': 0.0
+    }
+
+
+def _hist_median(hist):
+    """
+    根据时长直方图计算中位数
+    :param hist: 时长 -> 数量 的字典
+    :return: 中位数
+    """
+    total = sum(hist.values())
+    if total == 0:
+        return 0.0
+
+    values = sorted((float(hours), count) for hours, count in hist.items())
+    lower_rank = (total - 1) // 2
+    upper_rank = total // 2
+    lower = upper = None
+    seen = 0
+    for hours, count in values:
+        if lower is None and seen + count > lower_rank:
+            lower = hours
+        if seen + count > upper_rank:
+            upper = hours
+            break
+        seen += count
+    return round((lower + upper) / 2, 2)
+
+
+def update_rollups(rollups, reviews, seen=None):
+    """
+    将新一批评论增量累加到按天汇总中
+    去重键（recommendationid，没有ID时为各字段的组合）已在 seen 中的评论会被跳过，因此可以重复传入有重叠的批次
+    :param rollups: 汇总数据（原地更新）
+    :param reviews: 评论的可迭代对象
+    :param seen: 已计入评论的去重键集合（原地更新），默认只在本批内去重
+    :return: 更新后的汇总数据
+    """
+    # 只读汇总（如 cli.py stats）时不需要导入分类代码
+    from review_analysis import classify_feedback
+
+    days = rollups.setdefault('days', {})
+    if seen is None:
+        seen = set()
+    touched = set()
+    added = 0
+
+    for review in reviews:
+        publish_date = review.get('publish_date')
+        if not publish_date:
+            continue
+        review_key = _review_key(review)
+        if review_key in seen:
+            continue
+        seen.add(review_key)
+
+        # 已分类的评论直接复用结果，否则现场分类
+        if 'category' in review and 'sentiment' in review:
+            category = review['category']
+            sentiment = review['sentiment']
+        else:
+            classification = classify_feedback(review)
+            category = classification['category']
+            sentiment = classification['sentiment']
+
+        day = days.setdefault(publish_date, _new_day())
+        day['count'] += 1
+        if review.get('recommendation') == '推荐':
+            day['recommended'] += 1
+
+        counts = day['categories'].setdefault(category, [0, 0])
+        if sentiment == '正面':
+            counts[0] += 1
+        elif sentiment == '负面':
+            counts[1] += 1
+
+        hours_key = f"{float(review.get('hours', 0)):.1f}"
+        day['hours_hist'][hours_key] = day['hours_hist'].get(hours_key, 0) + 1
+        touched.add(publish_date)
+        added += 1
+
+    # 只重算本批涉及日期的中位数
+    for publish_date in touched:
+        days[publish_date]['median_hours'] = _hist_median(days[publish_date]['hours_hist'])
+
+    rollups['ingested'] = rollups.get('ingested', 0) + added
+    print(f"按天汇总新增 {added} 条评论")
+    return rollups
+
+
+def build_rollups(reviews):
+    """
+    从全部评论重新构建按天汇总
+    :param reviews: 评论列表
+    :return: 汇总数据
+    """
+    return update_rollups(_new_rollups(), reviews)
+
+
+def ingest_reviews(reviews, filename=ROLLUP_FILE, ids_filename=ROLLUP_IDS_FILE, rebuild=False):
+    """
+    加载汇总文件和去重键文件，增量计入新评论后保存
+    :param reviews: 评论的可迭代对象（已计入的评论会被跳过）
+    :param filename: 汇总文件名
+    :param ids_filename: 去重键文件名
+    :param rebuild: 为 True 时丢弃已有汇总和去重键，从本批评论重新构建
+    :return: 更新后的汇总数据
+    """
+    if rebuild:
+        rollups, seen = _new_rollups(), set()
+    else:
+        rollups, seen = load_rollups(filename), load_seen_ids(ids_filename)
+        seen.update(rollups.pop('legacy_ids', []))
+    rollups = update_rollups(rollups, reviews, seen)
+    save_rollups(rollups, filename)
+    save_seen_ids(seen, ids_filename)
+    return rollups
+
+
+def summarize_window(rollups, end_date=None, days=7):
+    """
+    汇总截止到某天（含）的连续若干天数据，只读取窗口内的按天汇总
+    :param rollups: 汇总数据
+    :param end_date: 窗口最后一天（YYYY-MM-DD），默认为最新一天
+    :param days: 窗口天数
+    :return: 窗口统计结果
+    """
+    all_days = rollups.get('days', {})
+    if end_date is None:
+        end_date = max(all_days) if all_days else datetime.now().strftime(DATE_FORMAT)
+    end = datetime.strptime(end_date, DATE_FORMAT)
+    start = end - timedelta(days=days - 1)
+
+    count = 0
+    recommended = 0
+    categories = {}
+    hours_hist = {}
+    for offset in range(days):
+        day = all_days.get((start + timedelta(days=offset)).strftime(DATE_FORMAT))
+        if day is None:
+            continue
+        count += day['count']
+        recommended += day['recommended']
+        for category, (positive, negative) in day['categories'].items():
+            counts = categories.setdefault(category, [0, 0])
+            counts[0] += positive
+            counts[1] += negative
+        for hours, hours_count in day['hours_hist'].items():
+            hours_hist[hours] = hours_hist.get(hours, 0) + hours_count
+
+    return {
+        'start_date': start.strftime(DATE_FORMAT),
+        'end_date': end.strftime(DATE_FORMAT),
+        'count': count,
+        'recommendation_rate': round(recommended / count, 4) if count else 0.0,
+        'categories': {
+            category: {'positive': positive, 'negative': negative}
+            for category, (positive, negative) in categories.items()
+        },
+        'median_hours': _hist_median(hours_hist)
+    }
+
+
+def rolling_windows(rollups, end_date=None, windows=(7, 30)):
+    """
+    计算多个滚动窗口的统计结果
+    :param rollups: 汇总数据
+    :param end_date: 窗口最后一天，默认为最新一天
+    :param windows: 窗口天数列表
+    :return: 窗口天数 -> 统计结果
+    """
+    return {days: summarize_window(rollups, end_date, days) for days in windows}
+
+
+def compare_periods(rollups, pivot_date, days=14):
+    """
+    对比某一天（如DLC上线日）前后各若干天的数据
+    :param rollups: 汇总数据
+    :param pivot_date: 分界日期（YYYY-MM-DD），计入之后的区间
+    :param days: 前后区间各自的天数
+    :return: 包含 before、after 和 delta 的字典
+    """
+    pivot = datetime.strptime(pivot_date, DATE_FORMAT)
+    before = summarize_window(rollups, (pivot - timedelta(days=1)).strftime(DATE_FORMAT), days)
+    after = summarize_window(rollups, (pivot + timedelta(days=days - 1)).strftime(DATE_FORMAT), days)
+    delta = {
+        'count': after['count'] - before['count'],
+        'recommendation_rate': round(after['recommendation_rate'] - before['recommendation_rate'], 4),
+        'median_hours': round(after['median_hours'] - before['median_hours'], 2)
+    }
+    return {'before': before, 'after': after, 'delta': delta}
+
+
+def print_window(label, window):
+    """
+    打印窗口统计结果
+    :param label: 标题
+    :param window: summarize_window 的返回值
+    """
+    print(f"\n=== {label} ({window['start_date']} ~ {window['end_date']}) ===")
+    print(f"评论数: {window['count']}")
+    print(f"推荐率: {window['recommendation_rate'] * 100:.1f}%")
+    print(f"游戏时长中位数: {window['median_hours']} 小时")
+    for category, counts in window['categories'].items():
+        print(f"{category}: 正面 {counts['positive']} / 负面 {counts['negative']}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    # 增量计入评论文件（默认为处理后的数据），已计入的评论会被跳过
+    filename = sys.argv[1] if len(sys.argv) > 1 else 'processed_reviews.json'
+    with open(filename, 'r', encoding='utf-8') as f:
+        rollups = ingest_reviews(json.load(f))
+
+    for days, window in rolling_windows(rollups).items():
+        print_window(f"近 {days} 天", window)
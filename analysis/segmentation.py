@@ -0,0 +1,301 @@
+import json
+from collections import Counter
+
+import numpy as np
+
+from review_analysis import FEEDBACK_CATEGORIES, count_category_hits
+
+MODEL_FILE = 'segmentation_model.json'
+
+# 用户画像名称
+CORE_FAN = '核心粉丝型'
+CASUAL = '轻度体验型'
+TECH_SENSITIVE = '技术敏感型'
+CONTENT_FOCUSED = '内容偏好型'
+
+TECH_CATEGORIES = ['性能', 'bug']
+CONTENT_CATEGORIES = ['画面', '剧情', '玩法', '音效']
+
+# 特征列：游戏时长、玩家等级、拥有游戏数（均取对数）、是否推荐、各分类命中数
+FEATURE_NAMES = ['hours', 'player_level', 'owned_games', 'recommendation'] + list(FEEDBACK_CATEGORIES)
+# 前三列为连续特征，按第一批数据的均值和标准差标准化；标准化参数随模型保存，保证增量更新时特征空间不变
+CONTINUOUS_FEATURES = 3
+# 是否推荐和分类命中数的权重，避免 0/1 的推荐标记或稀疏的关键词命中主导聚类
+RECOMMENDATION_WEIGHT = 0.5
+CATEGORY_WEIGHT = 0.5
+MAX_CATEGORY_HITS = 3
+
+
+def build_features(reviews):
+    """
+    构建用户特征矩阵（未标准化）
+    :param reviews: 评论列表
+    :return: 特征矩阵（评论数 x 特征数）
+    """
+    features = np.zeros((len(reviews), len(FEATURE_NAMES)))
+    for i, review in enumerate(reviews):
+        hits = count_category_hits(review.get('content', ''))
+        features[i, 0] = np.log1p(max(float(review.get('hours', 0)), 0))
+        features[i, 1] = np.log1p(max(float(review.get('player_level', 0)), 0))
+        features[i, 2] = np.log1p(max(float(review.get('owned_games', 0)), 0))
+        features[i, 3] = 1.0 if review.get('recommendation') == '推荐' else 0.0
+        features[i, 4:] = [min(hits[category], MAX_CATEGORY_HITS) for category in FEEDBACK_CATEGORIES]
+    return features
+
+
+def _weights():
+    return np.array([1.0] * CONTINUOUS_FEATURES + [RECOMMENDATION_WEIGHT] +
+                    [CATEGORY_WEIGHT] * len(FEEDBACK_CATEGORIES))
+
+
+def scale_features(model, features):
+    """
+    按模型保存的标准化参数和特征权重转换特征矩阵
+    :param model: 模型
+    :param features: build_features 的返回值
+    :return: 聚类使用的特征矩阵
+    """
+    return (features - model['feature_means']) / model['feature_stds'] * _weights()
+
+
+def raw_centroids(model):
+    """
+    将聚类中心转换回原始特征空间（对数时长、推荐率、平均命中数等）
+    :param model: 模型
+    :return: 聚类中心矩阵
+    """
+    return model['centroids'] / _weights() * model['feature_stds'] + model['feature_means']
+
+
+def iter_batches(reviews, batch_size=1024):
+    """
+    将评论流切分为小批次，不需要一次性加载全部评论
+    :param reviews: 评论的可迭代对象
+    :param batch_size: 每批评论数量
+    :return: 评论批次生成器
+    """
+    batch = []
+    for review in reviews:
+        batch.append(review)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _nearest(centroids, features):
+    distances = ((features[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+    return distances.argmin(axis=1)
+
+
+def init_model(features, k=4, seed=42):
+    """
+    用第一批数据确定标准化参数，并用 k-means++ 初始化聚类中心
+    :param features: build_features 的返回值
+    :param k: 聚类数量
+    :param seed: 随机种子
+    :return: 模型
+    """
+    if len(features) < k:
+        raise ValueError(f"初始化至少需要 {k} 条评论，当前只有 {len(features)} 条")
+
+    # 只标准化连续特征，推荐标记和命中数保持原值，只乘权重
+    means = np.zeros(len(FEATURE_NAMES))
+    stds = np.ones(len(FEATURE_NAMES))
+    means[:CONTINUOUS_FEATURES] = features[:, :CONTINUOUS_FEATURES].mean(axis=0)
+    stds[:CONTINUOUS_FEATURES] = np.maximum(features[:, :CONTINUOUS_FEATURES].std(axis=0), 1e-6)
+    features = (features - means) / stds * _weights()
+
+    rng = np.random.RandomState(seed)
+    centroids = [features[rng.randint(len(features))]]
+    for _ in range(k - 1):
+        distances = ((features[:, None, :] - np.array(centroids)[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        total = distances.sum()
+        if total == 0:
+            centroids.append(features[rng.randint(len(features))])
+        else:
+            centroids.append(features[rng.choice(len(features), p=distances / total)])
+
+    return {
+        'feature_names': FEATURE_NAMES,
+        'feature_means': means,
+        'feature_stds': stds,
+        'centroids': np.array(centroids),
+        'counts': np.zeros(k),
+        'personas': [f'群体{i + 1}' for i in range(k)],
+        'seen': 0
+    }
+
+
+def partial_fit(model, features):
+    """
+    用一批数据更新聚类中心（mini-batch k-means）
+    每个中心的学习率为 1/累计样本数，等价于对分配到该中心的样本取滑动均值
+    :param model: 模型（原地更新）
+    :param features: build_features 的返回值
+    :return: 本批数据的聚类编号
+    """
+    features = scale_features(model, features)
+    labels = _nearest(model['centroids'], features)
+    k = len(model['centroids'])
+    batch_counts = np.bincount(labels, minlength=k)
+    batch_sums = np.zeros_like(model['centroids'])
+    np.add.at(batch_sums, labels, features)
+
+    updated = batch_counts > 0
+    new_counts = model['counts'] + batch_counts
+    model['centroids'][updated] = (
+        model['centroids'][updated] * model['counts'][updated, None] + batch_sums[updated]
+    ) / new_counts[updated, None]
+    model['counts'] = new_counts
+    model['seen'] += len(features)
+    return labels
+
+
+def name_personas(model):
+    """
+    根据聚类中心的特征为每个聚类命名用户画像
+    时长最长为核心粉丝型，最短为轻度体验型；
+    其余聚类各自比较技术类和内容类关键词的命中数（均相对于全体平均值），技术类更高为技术敏感型，否则为内容偏好型
+    :param model: 模型（原地更新）
+    :return: 画像名称列表（同一名称可能对应多个聚类）
+    """
+    centroids = raw_centroids(model)
+    hours = centroids[:, FEATURE_NAMES.index('hours')]
+    tech = centroids[:, [FEATURE_NAMES.index(c) for c in TECH_CATEGORIES]].sum(axis=1)
+    content = centroids[:, [FEATURE_NAMES.index(c) for c in CONTENT_CATEGORIES]].sum(axis=1)
+
+    # 内容类关键词整体上比技术类常见得多，按全体平均值归一化后再比较
+    weights = model['counts'] if model['counts'].sum() else np.ones(len(centroids))
+    tech_ratio = tech / max(np.average(tech, weights=weights), 1e-6)
+    content_ratio = content / max(np.average(content, weights=weights), 1e-6)
+
+    personas = [f'群体{i + 1}' for i in range(len(centroids))]
+    order = list(np.argsort(hours))
+    if order:
+        personas[order.pop()] = CORE_FAN
+    if order:
+        personas[order.pop(0)] = CASUAL
+    for i in order:
+        personas[i] = TECH_SENSITIVE if tech_ratio[i] > content_ratio[i] else CONTENT_FOCUSED
+
+    model['personas'] = personas
+    return personas
+
+
+def assign_personas(model, reviews):
+    """
+    将评论分配到已有聚类中心，不更新模型
+    :param model: 模型
+    :param reviews: 评论列表
+    :return: 画像名称列表
+    """
+    labels = _nearest(model['centroids'], scale_features(model, build_features(reviews)))
+    return [model['personas'][label] for label in labels]
+
+
+def update_segments(model, reviews, k=4, batch_size=1024):
+    """
+    按批次增量训练并为新评论分配用户画像
+    重新分群时只需传入新增评论，已有聚类中心在此基础上继续更新
+    训练结束后再按最终的聚类中心分配画像，使返回的标签与模型一致
+    :param model: 已有模型，为 None 时用第一批数据初始化（不足 k 条时与后续批次合并后再初始化）
+    :param reviews: 新增评论的可迭代对象
+    :param k: 聚类数量
+    :param batch_size: 每批评论数量
+    :return: (更新后的模型, 画像名称列表)，评论不足以初始化模型时为 (None, [])
+    """
+    fitted = []
+    pending = []
+    for batch in iter_batches(reviews, batch_size):
+        features = build_features(batch)
+        if model is None:
+            pending.append(features)
+            features = np.vstack(pending)
+            if len(features) < k:
+                continue
+            model = init_model(features, k)
+            pending = []
+        partial_fit(model, features)
+        fitted.append(features)
+
+    if model is None:
+        if pending:
+            print(f"评论不足 {k} 条，无法初始化分群模型")
+        return model, []
+    personas = name_personas(model)
+    if not fitted:
+        return model, []
+    labels = _nearest(model['centroids'], scale_features(model, np.vstack(fitted)))
+    return model, [personas[label] for label in labels]
+
+
+def load_model(filename=MODEL_FILE):
+    """
+    加载分群模型
+    :param filename: 模型文件名
+    :return: 模型，文件不存在时返回 None
+    """
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            model = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    if model['feature_names'] != FEATURE_NAMES or 'feature_means' not in model:
+        print("分群模型的特征与当前版本不一致，将重新训练")
+        return None
+    for key in ('centroids', 'counts', 'feature_means', 'feature_stds'):
+        model[key] = np.array(model[key])
+    print(f"成功加载分群模型（已训练 {model['seen']} 条评论）")
+    return model
+
+
+def save_model(model, filename=MODEL_FILE):
+    """
+    保存分群模型
+    :param model: 模型
+    :param filename: 模型文件名
+    """
+    output = dict(model, centroids=model['centroids'].tolist(), counts=model['counts'].tolist(),
+                  feature_means=model['feature_means'].tolist(), feature_stds=model['feature_stds'].tolist())
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+    print(f"分群模型已保存到 {filename}")
+
+
+def print_segments(model, personas):
+    """
+    打印各用户画像的占比和聚类中心特征（同名的多个聚类按样本数加权合并）
+    :param model: 模型
+    :param personas: 画像名称列表
+    """
+    counts = Counter(personas)
+    total = len(personas)
+    centroids = raw_centroids(model)
+    print("\n=== 用户画像 ===")
+    for name in dict.fromkeys(model['personas']):
+        members = [i for i, persona in enumerate(model['personas']) if persona == name]
+        weights = model['counts'][members] if model['counts'][members].sum() else None
+        centroid = np.average(centroids[members], axis=0, weights=weights)
+        print(f"{name}: {counts[name]} ({counts[name] / total * 100:.1f}%) | "
+              f"时长约 {np.expm1(centroid[0]):.1f}h, 等级 {np.expm1(centroid[1]):.0f}, "
+              f"游戏数 {np.expm1(centroid[2]):.0f}, 推荐率 {centroid[3] * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    import sys
+
+    # 传入新一批评论文件时在已有模型上增量更新，否则使用处理后的全部数据
+    filename = sys.argv[1] if len(sys.argv) > 1 else 'processed_reviews.json'
+    with open(filename, 'r', encoding='utf-8') as f:
+        reviews = json.load(f)
+
+    model, personas = update_segments(load_model(), reviews)
+    if model is None:
+        if not reviews:
+            print("没有评论数据，无法进行分群")
+    else:
+        save_model(model)
+        print_segments(model, personas)
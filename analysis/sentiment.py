@@ -0,0 +1,197 @@
+import json
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+MODEL_FILE = 'sentiment_model.json'
+
+# 情感词典（词 -> 权重），以 segment_text 的分词结果为准：
+# 单字词和“不”“没有”等停用词已被过滤，常见的否定组合词（不好、不行等）直接作为词条。
+# 因此 NEGATION_WORDS 只对分词后仍保留的否定词生效，“没有闪退”这类分开的否定会只剩下“闪退”；
+# 技术问题词的否定组合见 NEGATED_TECH_LEXICON，其余情况（如“没遇到bug”）仍会被判为负面
+SENTIMENT_LEXICON = {
+    # 正面
+    '好玩': 1.0, '不错': 1.0, '喜欢': 1.0, '好评': 1.5, '推荐': 1.0, '优秀': 1.0,
+    '完美': 1.5, '神作': 2.0, '佳作': 1.5, '很棒': 1.5, '很爽': 1.0, '爽快': 1.0,
+    '爽感': 1.0, '舒服': 1.0, '惊喜': 1.0, '期待': 0.5, '值得': 1.0, '流畅': 1.0,
+    '稳定': 0.5, '伟大': 1.5, '顶级': 1.5, '最佳': 1.0, '精彩': 1.0, '精美': 1.0,
+    '震撼': 1.0, '沉浸': 0.5, '好看': 1.0, '满意': 1.0, '支持': 0.5, '经典': 0.5,
+    '刺激': 0.5, '情怀': 0.5, '集大成': 1.0, '无可挑剔': 2.0, '没话说': 1.5,
+    '没得说': 1.5, '不赖': 1.0, '不亏': 1.0, '不愧': 1.0, '赞赞': 1.0, '良心': 1.0,
+    '牛逼': 1.0, '好评如潮': 2.0, 'good': 1.0, 'great': 1.0,
+    # 负面
+    '差评': -2.0, '垃圾': -2.0, '失望': -1.5, '恶心': -1.0, '闪退': -2.0, '崩溃': -2.0,
+    '卡顿': -1.5, '掉帧': -1.5, '卡死': -2.0, '黑屏': -2.0, '报错': -1.5, '进不去': -2.0,
+    'bug': -1.0, '问题': -0.5, '无聊': -1.0, '不好': -1.0, '不行': -1.0, '不好玩': -1.5,
+    '不爽': -1.0, '不值': -1.5, '不足': -0.5, '不够': -0.5, '不满': -1.0, '缺点': -0.5,
+    '可惜': -0.5, '退款': -2.0, '糟糕': -1.5, '难受': -1.0, '无脑': -0.5, '敷衍': -1.5,
+    '阉割': -1.5, '太短': -1.0, '坐牢': -1.5, '折磨': -1.0, '劝退': -1.5,
+    'crash': -1.5
+}
+
+# 技术问题词的否定组合（没有闪退、不卡顿等）是对稳定性的肯定。
+# init_jieba 会把这些组合登记为自定义词，使其分词后作为一个词保留，而不是被拆成停用词和问题词
+NEGATED_TECH_PREFIXES = ('没有', '没', '不', '无', '零')
+NEGATED_TECH_TERMS = ('闪退', '崩溃', '卡顿', '掉帧', '卡死', '黑屏', '报错', 'bug')
+NEGATED_TECH_LEXICON = {prefix + term: 1.0 for prefix in NEGATED_TECH_PREFIXES for term in NEGATED_TECH_TERMS}
+NEGATED_TECH_LEXICON.update({'不卡': 1.0, '没卡': 1.0})
+SENTIMENT_LEXICON.update(NEGATED_TECH_LEXICON)
+
+# 否定词：作用于其后 NEGATION_WINDOW 个词，翻转情感
+NEGATION_WORDS = {'不是', '并不', '并非', '不太', '不怎么', '没什么', '毫无', '从不', '不会', '不算', '无法', '不能'}
+NEGATION_WINDOW = 2
+
+# 程度副词：作用于其后一个词，调整情感强度
+DEGREE_WORDS = {'非常': 1.5, '特别': 1.5, '十分': 1.5, '超级': 1.5, '极其': 2.0, '真的': 1.2,
+                '有点': 0.5, '有些': 0.5, '稍微': 0.5, '略微': 0.5}
+
+
+def build_term_matrix(word_lists, vocabulary):
+    """
+    将分词结果构建为稀疏的评论-词矩阵，矩阵值已包含否定和程度修饰
+    :param word_lists: 每条评论的分词结果
+    :param vocabulary: 词 -> 列号
+    :return: 稀疏矩阵（评论数 x 词数）
+    """
+    rows = []
+    cols = []
+    values = []
+    for row, words in enumerate(word_lists):
+        negation_left = 0
+        degree = 1.0
+        for word in words:
+            if word in NEGATION_WORDS:
+                negation_left = NEGATION_WINDOW
+                continue
+            if word in DEGREE_WORDS:
+                degree = DEGREE_WORDS[word]
+                continue
+
+            col = vocabulary.get(word)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+                values.append(-degree if negation_left > 0 else degree)
+            negation_left = max(negation_left - 1, 0)
+            degree = 1.0
+
+    return csr_matrix(
+        (np.array(values, dtype=np.float32), (np.array(rows, dtype=np.int32), np.array(cols, dtype=np.int32))),
+        shape=(len(word_lists), len(vocabulary))
+    )
+
+
+LEXICON_VOCABULARY = {word: i for i, word in enumerate(SENTIMENT_LEXICON)}
+LEXICON_WEIGHTS = np.array(list(SENTIMENT_LEXICON.values()), dtype=np.float32)
+
+
+def lexicon_scores(word_lists):
+    """
+    基于情感词典批量计算情感得分
+    :param word_lists: 每条评论的分词结果
+    :return: [-1, 1] 之间的得分数组，未命中情感词的评论为 0
+    """
+    matrix = build_term_matrix(word_lists, LEXICON_VOCABULARY)
+    raw = matrix @ LEXICON_WEIGHTS
+    # 按命中词数的平方根归一化，避免长评论得分被无限放大
+    hits = np.diff(matrix.indptr)
+    return np.tanh(raw / np.sqrt(np.maximum(hits, 1)))
+
+
+def _sigmoid(z):
+    return 1 / (1 + np.exp(-np.clip(z, -30, 30)))
+
+
+def train_sentiment_model(reviews, min_count=3, l2=1e-4, learning_rate=1.0, epochs=200):
+    """
+    以推荐状态为标签训练轻量逻辑回归模型
+    :param reviews: 评论列表，需要 words 和 recommendation 字段
+    :param min_count: 词出现的最少次数
+    :param l2: L2 正则系数
+    :param learning_rate: 学习率
+    :param epochs: 迭代次数
+    :return: 模型
+    """
+    counts = {}
+    for review in reviews:
+        for word in set(review.get('words', [])):
+            counts[word] = counts.get(word, 0) + 1
+    vocabulary = {}
+    for word, count in counts.items():
+        if count >= min_count:
+            vocabulary[word] = len(vocabulary)
+
+    matrix = build_term_matrix([review.get('words', []) for review in reviews], vocabulary)
+    labels = np.array([1.0 if review.get('recommendation') == '推荐' else 0.0 for review in reviews])
+    weights = np.zeros(len(vocabulary))
+    bias = 0.0
+    n = len(reviews)
+
+    # 全量梯度下降，每轮只需两次稀疏矩阵乘法
+    for _ in range(epochs):
+        errors = _sigmoid(matrix @ weights + bias) - labels
+        weights -= learning_rate * (matrix.T @ errors / n + l2 * weights)
+        bias -= learning_rate * errors.mean()
+
+    accuracy = np.mean((_sigmoid(matrix @ weights + bias) > 0.5) == labels)
+    print(f"情感模型训练完成，词表大小 {len(vocabulary)}，训练集准确率 {accuracy * 100:.1f}%")
+    return {'vocabulary': list(vocabulary), 'weights': weights.tolist(), 'bias': bias}
+
+
+def model_scores(model, word_lists):
+    """
+    使用逻辑回归模型批量计算情感得分
+    :param model: 模型
+    :param word_lists: 每条评论的分词结果
+    :return: [-1, 1] 之间的得分数组
+    """
+    vocabulary = {word: i for i, word in enumerate(model['vocabulary'])}
+    matrix = build_term_matrix(word_lists, vocabulary)
+    return 2 * _sigmoid(matrix @ np.array(model['weights']) + model['bias']) - 1
+
+
+def score_reviews(reviews, model=None):
+    """
+    批量计算评论的连续情感得分，与推荐状态无关
+    :param reviews: 评论列表，需要 words 字段
+    :param model: 可选的逻辑回归模型，提供时与词典得分取平均
+    :return: [-1, 1] 之间的得分数组
+    """
+    word_lists = [review.get('words', []) for review in reviews]
+    scores = lexicon_scores(word_lists)
+    if model is not None:
+        scores = (scores + model_scores(model, word_lists)) / 2
+    return np.round(scores, 4)
+
+
+def load_sentiment_model(filename=MODEL_FILE):
+    """
+    加载情感模型
+    :param filename: 模型文件名
+    :return: 模型，文件不存在时返回 None
+    """
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            model = json.load(f)
+        print(f"成功加载情感模型（词表大小 {len(model['vocabulary'])}）")
+        return model
+    except FileNotFoundError:
+        return None
+
+
+def save_sentiment_model(model, filename=MODEL_FILE):
+    """
+    保存情感模型
+    :param model: 模型
+    :param filename: 模型文件名
+    """
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(model, f, ensure_ascii=False)
+    print(f"情感模型已保存到 {filename}")
+
+
+if __name__ == "__main__":
+    # 使用处理后的数据训练情感模型
+    with open('processed_reviews.json', 'r', encoding='utf-8') as f:
+        reviews = json.load(f)
+    save_sentiment_model(train_sentiment_model(reviews))
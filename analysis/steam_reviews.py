@@ -1,13 +1,8 @@
 import json
 import time
 import re
-import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.edge.service import Service
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
+from excel_export import write_reviews_excel
+from instrumentation import stage, add_items, record_http, timed_sleep, write_report, print_report
 
 def get_steam_reviews(appid, max_reviews=100):
     """
@@ -16,6 +11,14 @@ def get_steam_reviews(appid, max_reviews=100):
     :param max_reviews: 最大评论数量
     :return: 评论列表
     """
+    # Selenium 导入较慢，只在需要打开浏览器时导入
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.edge.service import Service
+    from webdriver_manager.microsoft import EdgeChromiumDriverManager
+    
     reviews = []
     
     # 配置浏览器
@@ -35,7 +38,7 @@ def get_steam_reviews(appid, max_reviews=100):
         driver.get(url)
         
         # 等待页面加载
-        time.sleep(5)
+        timed_sleep(5)
         
         # 选择中文评论
         try:
@@ -43,14 +46,14 @@ def get_steam_reviews(appid, max_reviews=100):
                 EC.presence_of_element_located((By.ID, 'language_filter'))
             )
             language_selector.click()
-            time.sleep(2)
+            timed_sleep(2)
             
             # 选择简体中文
             chinese_option = WebDriverWait(driver, 10).until(
                 EC.presence_of_element_located((By.XPATH, "//div[@class='popup_menu_item' and text()='简体中文']"))
             )
             chinese_option.click()
-            time.sleep(5)
+            timed_sleep(5)
         except Exception as e:
             print(f"设置语言时出错: {e}")
         
@@ -125,7 +128,7 @@ def get_steam_reviews(appid, max_reviews=100):
             
             # 滚动到底部加载更多评论
             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(3)
+            timed_sleep(3)
             
             # 检查是否到达页面底部
             new_height = driver.execute_script("return document.body.scrollHeight")
@@ -153,6 +156,8 @@ def get_player_info(steamid):
         'owned_games': 0
     }
     
+    import requests
+    
     # 添加请求头，模拟浏览器
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -167,7 +172,13 @@ def get_player_info(steamid):
         retries = 3
         for attempt in range(retries):
             try:
-                level_response = requests.get(level_url, headers=headers, timeout=15)
+                request_start = time.perf_counter()
+                try:
+                    level_response = requests.get(level_url, headers=headers, timeout=15)
+                except Exception as e:
+                    record_http('profile', type(e).__name__, time.perf_counter() - request_start, retry=attempt > 0)
+                    raise
+                record_http('profile', level_response.status_code, time.perf_counter() - request_start, retry=attempt > 0)
                 if level_response.status_code == 200:
                     # 提取等级信息
                     level_match = re.search(r'Level (\d+)', level_response.text)
@@ -178,18 +189,24 @@ def get_player_info(steamid):
                 print(f"获取玩家等级时出错: {e}")
                 if attempt < retries - 1:
                     print(f"等待 3 秒后重试...")
-                    time.sleep(3)
+                    timed_sleep(3)
                 else:
                     print("获取玩家等级失败")
         
         # 等待一段时间再请求游戏库信息
-        time.sleep(2)
+        timed_sleep(2)
         
         # 获取玩家游戏库信息
         games_page_url = f"https://steamcommunity.com/profiles/{steamid}/games/?tab=all"
         for attempt in range(retries):
             try:
-                games_response = requests.get(games_page_url, headers=headers, timeout=15)
+                request_start = time.perf_counter()
+                try:
+                    games_response = requests.get(games_page_url, headers=headers, timeout=15)
+                except Exception as e:
+                    record_http('games', type(e).__name__, time.perf_counter() - request_start, retry=attempt > 0)
+                    raise
+                record_http('games', games_response.status_code, time.perf_counter() - request_start, retry=attempt > 0)
                 if games_response.status_code == 200:
                     # 提取拥有的游戏数量
                     games_count_match = re.search(r'(\d+) games', games_response.text)
@@ -205,12 +222,12 @@ def get_player_info(steamid):
                 print(f"获取玩家游戏库信息时出错: {e}")
                 if attempt < retries - 1:
                     print(f"等待 3 秒后重试...")
-                    time.sleep(3)
+                    timed_sleep(3)
                 else:
                     print("获取玩家游戏库信息失败")
         
         # 避免请求过于频繁
-        time.sleep(2)
+        timed_sleep(2)
         
     except Exception as e:
         print(f"获取玩家信息时出错: {e}")
@@ -258,11 +275,12 @@ def process_reviews(reviews):
     
     return processed_reviews
 
-def save_reviews_to_file(reviews, filename):
+def save_reviews_to_file(reviews, filename, summaries=None):
     """
     保存评论到文件
     :param reviews: 评论列表
     :param filename: 文件名
+    :param summaries: 可选的Excel汇总表，工作表名 -> 行列表（第一行为表头）
     """
     # 保存为JSON文件
     with open(filename, 'w', encoding='utf-8') as f:
@@ -272,8 +290,8 @@ def save_reviews_to_file(reviews, filename):
     # 保存为Excel文件
     excel_filename = filename.replace('.json', '.xlsx')
     try:
-        df = pd.DataFrame(reviews)
-        df.to_excel(excel_filename, index=False, engine='openpyxl')
+        # 流式写入，超过单表行数上限时自动分表
+        write_reviews_excel(reviews, excel_filename, summaries=summaries)
         print(f"评论已保存到 {excel_filename}")
     except Exception as e:
         print(f"保存为Excel文件时出错: {e}")
@@ -286,13 +304,19 @@ if __name__ == "__main__":
     print("开始使用Selenium获取 Resident Evil Requiem 的评论...")
     print(f"游戏AppID: {appid}")
     
-    reviews = get_steam_reviews(appid, max_reviews=50)
+    with stage('crawl'):
+        reviews = get_steam_reviews(appid, max_reviews=50)
+    add_items('crawl', len(reviews))
     
     print(f"共获取到 {len(reviews)} 条评论")
     
     if reviews:
-        processed_reviews = process_reviews(reviews)
-        save_reviews_to_file(processed_reviews, 'resident_evil_requiem_reviews.json')
+        with stage('enrich', items=len(reviews)):
+            processed_reviews = process_reviews(reviews)
+        with stage('save', items=len(processed_reviews)):
+            save_reviews_to_file(processed_reviews, 'resident_evil_requiem_reviews.json')
     else:
         print("未获取到评论")
         print("可能的原因：1. 游戏刚发售还没有评论 2. 网络连接问题 3. AppID错误")
+    
+    print_report(write_report())
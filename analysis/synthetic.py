@@ -0,0 +1,138 @@
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+
+# 短评（真实数据中约三成评论不足10个字）
+SHORT_POSITIVE = ['好玩', '神作', '里昂帅', '好评', '爽', '太好玩了', '值得购买', '系列最佳', '强烈推荐', '三光']
+SHORT_NEGATIVE = ['差评', '闪退', '进不去', '垃圾优化', '不值', '退款了', '手柄用不了', '太短了']
+
+POSITIVE_PHRASES = [
+    '画面非常精美，光影效果拉满', '剧情紧凑，双线叙事很有意思', '格蕾丝线的潜行和解谜很有压迫感',
+    '里昂线的战斗非常爽快', '恐怖氛围做得很到位', '浣熊市的场景还原让老玩家很有情怀',
+    '音效和配音都很棒，戴耳机体验更好', '资源管理很有系列的味道', 'boss战设计得很有意思',
+    '优化不错，高画质也很流畅', '整体质量对得起30周年纪念作', '手感比前作更好',
+    '关卡设计很用心，探索的乐趣很足', '强烈推荐给系列粉丝', '通关之后还想再玩一遍'
+]
+NEGATIVE_PHRASES = [
+    '开光追之后经常卡顿掉帧', '打到一半直接闪退，存档都没了', '启动报错进不去游戏',
+    '手柄适配很差，震动和按键都有问题', '主线只有8到10个小时，流程太短', '这个价格内容量实在不够',
+    '后期剧情比较敷衍', '战斗多怪的时候帧率掉得厉害', '没有佣兵模式有点失望',
+    '新显卡适配不足，希望尽快出补丁', '内存占用越来越高，玩久了就卡', '难度曲线不太合理，新手容易劝退'
+]
+NEUTRAL_PHRASES = [
+    '目前玩了几个小时', '总体来说', '作为系列老玩家', '说一下个人感受', '等打折再入也可以',
+    '第一人称和第三人称可以切换', '通关用了十个小时左右', '期待后续的DLC'
+]
+# 单条评论的最大长度（真实数据中最长约4400字）
+MAX_LENGTH = 5000
+
+# 复制粘贴类评论，用于覆盖去重场景
+COPYPASTA = [
+    '大家好，我是生化危机9里昂S肯尼迪的脸模，游戏已正式发售，感谢大家的支持',
+    '玩格蕾丝我唯唯诺诺，玩里昂我重拳出击',
+    '太好玩了太好玩了太好玩了太好玩了太好玩了'
+]
+
+
+def _review_text(rng, recommended, target_length, negative_mix=0.15):
+    """
+    按目标长度拼接一条评论
+    推荐评论中混入少量负面内容，不推荐评论中混入少量正面内容，贴近真实评论
+    """
+    if target_length < 10:
+        pool = SHORT_POSITIVE if recommended else SHORT_NEGATIVE
+        return pool[rng.randint(len(pool))]
+
+    main_pool, other_pool = (POSITIVE_PHRASES, NEGATIVE_PHRASES) if recommended else (NEGATIVE_PHRASES, POSITIVE_PHRASES)
+    phrases = []
+    length = 0
+    while length < target_length:
+        roll = rng.rand()
+        if roll < 0.2:
+            pool = NEUTRAL_PHRASES
+        elif roll < 0.2 + negative_mix:
+            pool = other_pool
+        else:
+            pool = main_pool
+        phrase = pool[rng.randint(len(pool))]
+        phrases.append(phrase)
+        length += len(phrase) + 1
+    return '，'.join(phrases) + '。'
+
+
+def generate_raw_reviews(count, recommend_ratio=0.85, median_length=21, length_sigma=1.2,
+                         copypasta_ratio=0.02, days=30, end_timestamp=None, seed=42):
+    """
+    生成与 Steam appreviews 接口格式一致的模拟评论
+    :param count: 评论数量
+    :param recommend_ratio: 推荐比例
+    :param median_length: 评论长度（字数）中位数
+    :param length_sigma: 评论长度对数正态分布的离散程度，越大长评越多
+    :param copypasta_ratio: 复制粘贴类评论的比例
+    :param days: 评论时间分布的天数
+    :param end_timestamp: 最新评论的时间戳，默认为当前时间
+    :param seed: 随机种子
+    :return: 评论生成器
+    """
+    rng = np.random.RandomState(seed)
+    end_timestamp = end_timestamp or int(time.time())
+
+    for i in range(count):
+        recommended = rng.rand() < recommend_ratio
+        if rng.rand() < copypasta_ratio:
+            content = COPYPASTA[rng.randint(len(COPYPASTA))]
+        else:
+            target_length = min(int(rng.lognormal(np.log(median_length), length_sigma)), MAX_LENGTH)
+            content = _review_text(rng, recommended, target_length)
+
+        timestamp = end_timestamp - int(rng.rand() * days * 86400)
+        playtime = int(rng.lognormal(np.log(8 * 60), 0.9))  # 时长中位数约8小时
+        yield {
+            'recommendationid': f"{i + 1}",
+            'author': {
+                'steamid': f"7656119{rng.randint(10 ** 9, 10 ** 10, dtype=np.int64)}",
+                'playtime_forever': playtime,
+                'playtime_last_two_weeks': min(playtime, int(rng.rand() * 20 * 60))
+            },
+            'voted_up': bool(recommended),
+            'review': content,
+            'timestamp_created': timestamp,
+            'timestamp_updated': timestamp,
+            'comment_count': int(rng.poisson(0.5)),
+            'steam_purchase': True,
+            'received_for_free': False,
+            'written_during_early_access': False
+        }
+
+
+def generate_processed_reviews(count, seed=42, **kwargs):
+    """
+    生成与 process_reviews 输出格式一致的模拟评论（不请求玩家信息）
+    :param count: 评论数量
+    :param seed: 随机种子
+    :param kwargs: 传给 generate_raw_reviews 的参数
+    :return: 评论生成器
+    """
+    rng = np.random.RandomState(seed + 1)
+    for review in generate_raw_reviews(count, seed=seed, **kwargs):
+        yield {
+            'recommendationid': review['recommendationid'],
+            'publish_date': datetime.fromtimestamp(review['timestamp_created']).strftime('%Y-%m-%d'),
+            'content': review['review'],
+            'recommendation': '推荐' if review['voted_up'] else '不推荐',
+            'hours': round(review['author']['playtime_forever'] / 60, 1),
+            'player_level': int(rng.randint(1, 51)),
+            'owned_games': int(rng.lognormal(np.log(80), 0.8)) + 1
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    filename = f'synthetic_reviews_{count}.json'
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(list(generate_processed_reviews(count)), f, ensure_ascii=False, indent=2)
+    print(f"已生成 {count} 条模拟评论，保存到 {filename}")
@@ -0,0 +1,356 @@
+import json
+from datetime import datetime
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.linalg import svds
+
+MODEL_FILE = 'topic_model.json'
+MATRIX_FILE = 'topic_model.npz'
+
+# 情感得分低于该值的推荐评论也视为负面反馈（如推荐但吐槽闪退）
+NEGATIVE_SCORE_THRESHOLD = -0.2
+
+# 对归因没有区分度的高频词
+TOPIC_STOPWORDS = {
+    '游戏', '里昂', '格蕾丝', '生化', '生化危机', '危机', '就是', '还是', '可以', '感觉', '但是',
+    '真的', '这个', '什么', '有点', '非常', '不是', '还有', '直接', '知道', '一样', '这么',
+    '为什么', '而且', '目前', '觉得', '一点', '一部', '只能', '开始', '虽然', '那个', '确实',
+    '然后', '一下', '不过', '作为', '如果', '已经', '出来', '一直', '为了', '这种', '看到',
+    '怎么', '之后', '现在', '因为', '甚至', '很多', '来说', '需要', '两个', '其他', '个人',
+    '东西', '本作', '只是', '那么', '时间', '一次', '可能', '结果', '发现', '地方', '下来',
+    '比较', '基本', '各种', '应该', '出现', '里面', '我们', '你们', '所有', '以为', '方面'
+}
+
+
+def select_negative_reviews(reviews, threshold=NEGATIVE_SCORE_THRESHOLD):
+    """
+    筛选负面反馈：不推荐的评论，以及内容情感得分明显偏负面的推荐评论
+    :param reviews: 评论列表
+    :param threshold: 情感得分阈值
+    :return: 负面评论列表
+    """
+    return [
+        review for review in reviews
+        if review.get('sentiment') == '负面' or review.get('sentiment_score', 0) < threshold
+    ]
+
+
+def new_topic_model(n_topics=8, max_vocabulary=5000, forget=0.95):
+    """
+    创建空的主题模型
+    :param n_topics: 主题数量
+    :param max_vocabulary: 词表上限
+    :param forget: 每批次对历史统计量的衰减系数，越小越偏向近期数据
+    :return: 模型
+    """
+    return {
+        'n_topics': n_topics,
+        'max_vocabulary': max_vocabulary,
+        'forget': forget,
+        'vocabulary': [],
+        'seen': 0,
+        'topic_share': {},  # 周 -> 各主题权重之和
+        'week_counts': {},  # 周 -> 评论数
+        'components': np.zeros((n_topics, 0)),
+        'stats_a': np.zeros((n_topics, 0)),
+        'stats_b': np.zeros((n_topics, n_topics)),
+        'cooccurrence': csr_matrix((0, 0))
+    }
+
+
+def _extend_vocabulary(model, word_lists, min_df=2):
+    """
+    将本批次中至少出现在 min_df 条评论里的新词加入词表，已有词的列号保持不变
+    """
+    index = {word: i for i, word in enumerate(model['vocabulary'])}
+    doc_freq = {}
+    for words in word_lists:
+        for word in set(words):
+            if word not in index and word not in TOPIC_STOPWORDS:
+                doc_freq[word] = doc_freq.get(word, 0) + 1
+
+    room = model['max_vocabulary'] - len(index)
+    new_words = sorted((w for w, df in doc_freq.items() if df >= min_df), key=lambda w: -doc_freq[w])[:max(room, 0)]
+    for word in new_words:
+        index[word] = len(model['vocabulary'])
+        model['vocabulary'].append(word)
+    return index, len(new_words)
+
+
+def _resize(matrix, shape):
+    coo = matrix.tocoo()
+    return csr_matrix((coo.data, (coo.row, coo.col)), shape=shape)
+
+
+def build_doc_term_matrix(word_lists, index):
+    """
+    构建稀疏的评论-词矩阵（对数词频，按行 L2 归一化）
+    :param word_lists: 每条评论的分词结果
+    :param index: 词 -> 列号
+    :return: 稀疏矩阵（评论数 x 词数）
+    """
+    rows = []
+    cols = []
+    for row, words in enumerate(word_lists):
+        for word in words:
+            col = index.get(word)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+
+    matrix = csr_matrix(
+        (np.ones(len(rows)), (np.array(rows, dtype=np.int32), np.array(cols, dtype=np.int32))),
+        shape=(len(word_lists), len(index))
+    )
+    matrix.sum_duplicates()
+    matrix.data = np.log1p(matrix.data)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return csr_matrix(matrix.multiply(1 / norms[:, None]))
+
+
+def _solve_weights(matrix, components, rng, iterations=50, eps=1e-10):
+    """
+    固定主题-词矩阵，用乘法更新求解评论-主题权重
+    """
+    weights = rng.rand(matrix.shape[0], components.shape[0]) * 0.1 + eps
+    numerator = np.asarray(matrix @ components.T)
+    gram = components @ components.T
+    for _ in range(iterations):
+        weights *= numerator / (weights @ gram + eps)
+    return weights
+
+
+def _nndsvd_components(matrix, n_topics, rng, eps=1e-10):
+    """
+    用 NNDSVD 从数据初始化主题-词矩阵：每个主题取一个奇异向量中正负两部分里较大的一部分，
+    零值用平均值填充（NNDSVDa），以便乘法更新能够调整
+    评论数太少无法分解时，用随机抽取的评论行之和初始化
+    """
+    n_docs, n_terms = matrix.shape
+    if min(n_docs, n_terms) <= n_topics:
+        components = np.zeros((n_topics, n_terms))
+        for topic in range(n_topics):
+            rows = rng.choice(n_docs, size=min(n_docs, 5), replace=False)
+            components[topic] = np.asarray(matrix[rows].sum(axis=0)).ravel()
+        return components + matrix.mean() + eps
+
+    u, s, vt = svds(matrix, k=n_topics, random_state=rng.randint(2 ** 31 - 1))
+    # svds 的奇异值按升序返回
+    order = np.argsort(-s)
+    u, s, vt = u[:, order], s[order], vt[order]
+
+    components = np.zeros((n_topics, n_terms))
+    components[0] = np.sqrt(s[0]) * np.abs(vt[0])
+    for topic in range(1, n_topics):
+        x, y = u[:, topic], vt[topic]
+        x_pos, x_neg = np.maximum(x, 0), np.maximum(-x, 0)
+        y_pos, y_neg = np.maximum(y, 0), np.maximum(-y, 0)
+        positive = np.linalg.norm(x_pos) * np.linalg.norm(y_pos)
+        negative = np.linalg.norm(x_neg) * np.linalg.norm(y_neg)
+        if positive >= negative:
+            norm, vector, sigma = np.linalg.norm(y_pos), y_pos, positive
+        else:
+            norm, vector, sigma = np.linalg.norm(y_neg), y_neg, negative
+        if norm > 0:
+            components[topic] = np.sqrt(s[topic] * sigma) * vector / norm
+    components[components < eps] = matrix.mean()
+    return components
+
+
+def _week_of(publish_date):
+    year, week, _ = datetime.strptime(publish_date, '%Y-%m-%d').isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def update_topic_model(model, reviews, seed=42, passes=10, iterations=10, eps=1e-10):
+    """
+    用一批新增负面评论增量更新主题模型（在线 NMF）
+    只累积 W^T X 和 W^T W 两个统计量，无需在全部历史评论上重新训练
+    第一批数据用 NNDSVD 初始化主题；每批次交替求解评论-主题权重和更新主题-词矩阵
+    :param model: 模型（原地更新）
+    :param reviews: 新增负面评论列表，需要 words 和 publish_date 字段
+    :param seed: 随机种子
+    :param passes: 每批次交替求解的轮数
+    :param iterations: 每轮主题-词矩阵的迭代次数
+    :param eps: 防止除零的小量
+    :return: 每条评论的主题权重（行和为 1，未命中词表的评论全为 0）
+    """
+    if not reviews:
+        return np.zeros((0, model['n_topics']))
+
+    rng = np.random.RandomState(seed + model['seen'])
+    first_batch = not model['stats_b'].any()
+    word_lists = [review.get('words', []) for review in reviews]
+    index, added = _extend_vocabulary(model, word_lists)
+    n_topics = model['n_topics']
+    n_terms = len(index)
+
+    # 新词对应的列：统计量补零，主题-词矩阵补小的正数以便乘法更新能够生效
+    if added:
+        scale = model['components'].mean() if model['components'].size else 1.0
+        model['components'] = np.hstack([model['components'], rng.rand(n_topics, added) * scale])
+        model['stats_a'] = np.hstack([model['stats_a'], np.zeros((n_topics, added))])
+        model['cooccurrence'] = _resize(model['cooccurrence'], (n_terms, n_terms))
+
+    matrix = build_doc_term_matrix(word_lists, index)
+
+    # 词共现矩阵
+    binary = matrix.copy()
+    binary.data[:] = 1
+    model['cooccurrence'] = model['cooccurrence'] + binary.T @ binary
+
+    # 本批没有评论命中词表（如第一批只有一条评论，词表仍为空）时不更新主题，
+    # stats_b 保持不变，第一批的初始化推迟到词表非空的批次
+    if matrix.nnz == 0:
+        model['seen'] += len(reviews)
+        return np.zeros((len(reviews), n_topics))
+
+    if first_batch:
+        model['components'] = _nndsvd_components(matrix, n_topics, rng, eps)
+
+    # 交替求解本批次的评论-主题权重和主题-词矩阵，每轮都以衰减后的历史统计量为基础
+    history_a = model['forget'] * model['stats_a']
+    history_b = model['forget'] * model['stats_b']
+    for _ in range(passes):
+        weights = _solve_weights(matrix, model['components'], rng)
+        model['stats_a'] = history_a + np.asarray((matrix.T @ weights).T)
+        model['stats_b'] = history_b + weights.T @ weights
+        for _ in range(iterations):
+            model['components'] *= model['stats_a'] / (model['stats_b'] @ model['components'] + eps)
+
+    # 用更新后的主题重新求解权重，并按周累计主题占比
+    weights = _solve_weights(matrix, model['components'], rng)
+    totals = weights.sum(axis=1, keepdims=True)
+    weights = np.divide(weights, totals, out=np.zeros_like(weights), where=totals > 0)
+    for review, row in zip(reviews, weights):
+        if not review.get('publish_date') or row.sum() == 0:
+            continue
+        week = _week_of(review['publish_date'])
+        share = model['topic_share'].setdefault(week, [0.0] * n_topics)
+        model['topic_share'][week] = [s + w for s, w in zip(share, row.tolist())]
+        model['week_counts'][week] = model['week_counts'].get(week, 0) + 1
+
+    model['seen'] += len(reviews)
+    return weights
+
+
+def topic_terms(model, top_n=10):
+    """
+    获取每个主题权重最高的词
+    :param model: 模型
+    :param top_n: 每个主题的词数
+    :return: 主题词列表
+    """
+    return [
+        [model['vocabulary'][i] for i in np.argsort(-row)[:top_n]]
+        for row in model['components']
+    ]
+
+
+def topic_share_over_time(model):
+    """
+    计算每周各主题的占比
+    :param model: 模型
+    :return: 周 -> 各主题占比
+    """
+    return {
+        week: [round(s / model['week_counts'][week], 4) for s in share]
+        for week, share in sorted(model['topic_share'].items())
+    }
+
+
+def top_cooccurring_terms(model, word, top_n=10):
+    """
+    获取与某个词共现次数最多的词
+    :param model: 模型
+    :param word: 词
+    :param top_n: 返回的词数
+    :return: (词, 共现评论数) 列表
+    """
+    if word not in model['vocabulary']:
+        return []
+    row = model['cooccurrence'].getrow(model['vocabulary'].index(word)).tocoo()
+    pairs = [(model['vocabulary'][col], int(count)) for col, count in zip(row.col, row.data) if model['vocabulary'][col] != word]
+    return sorted(pairs, key=lambda pair: -pair[1])[:top_n]
+
+
+def load_topic_model(filename=MODEL_FILE, matrix_filename=MATRIX_FILE):
+    """
+    加载主题模型
+    :param filename: 模型文件名（词表和按周统计）
+    :param matrix_filename: 矩阵文件名
+    :return: 模型，文件不存在时返回 None
+    """
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            model = json.load(f)
+        arrays = np.load(matrix_filename)
+    except FileNotFoundError:
+        return None
+
+    model['components'] = arrays['components']
+    model['stats_a'] = arrays['stats_a']
+    model['stats_b'] = arrays['stats_b']
+    model['cooccurrence'] = csr_matrix(
+        (arrays['cooc_data'], arrays['cooc_indices'], arrays['cooc_indptr']),
+        shape=tuple(arrays['cooc_shape'])
+    )
+    print(f"成功加载主题模型（已训练 {model['seen']} 条负面评论）")
+    return model
+
+
+def save_topic_model(model, filename=MODEL_FILE, matrix_filename=MATRIX_FILE):
+    """
+    保存主题模型
+    :param model: 模型
+    :param filename: 模型文件名（词表和按周统计）
+    :param matrix_filename: 矩阵文件名
+    """
+    arrays = ('components', 'stats_a', 'stats_b', 'cooccurrence')
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump({k: v for k, v in model.items() if k not in arrays}, f, ensure_ascii=False, indent=2)
+
+    cooccurrence = model['cooccurrence'].tocsr()
+    np.savez_compressed(
+        matrix_filename,
+        components=model['components'],
+        stats_a=model['stats_a'],
+        stats_b=model['stats_b'],
+        cooc_data=cooccurrence.data,
+        cooc_indices=cooccurrence.indices,
+        cooc_indptr=cooccurrence.indptr,
+        cooc_shape=np.array(cooccurrence.shape)
+    )
+    print(f"主题模型已保存到 {filename} 和 {matrix_filename}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    # 传入新一周的评论文件时在已有模型上增量更新，否则使用处理后的全部数据
+    filename = sys.argv[1] if len(sys.argv) > 1 else 'processed_reviews.json'
+    with open(filename, 'r', encoding='utf-8') as f:
+        negative_reviews = select_negative_reviews(json.load(f))
+    print(f"负面评论: {len(negative_reviews)} 条")
+
+    model = load_topic_model() or new_topic_model()
+    weights = update_topic_model(model, negative_reviews)
+    save_topic_model(model)
+
+    with open('negative_topic_weights.json', 'w', encoding='utf-8') as f:
+        json.dump([
+            {'publish_date': review.get('publish_date'), 'content': review.get('content', ''),
+             'topic_weights': [round(w, 4) for w in row]}
+            for review, row in zip(negative_reviews, weights.tolist())
+        ], f, ensure_ascii=False, indent=2)
+    print("评论主题权重已保存到 negative_topic_weights.json")
+
+    print("\n=== 负面反馈主题 ===")
+    for i, terms in enumerate(topic_terms(model)):
+        print(f"主题{i + 1}: {' '.join(terms)}")
+
+    print("\n=== 主题周占比 ===")
+    for week, share in topic_share_over_time(model).items():
+        print(f"{week}: " + ', '.join(f"主题{i + 1} {s * 100:.1f}%" for i, s in enumerate(share)))